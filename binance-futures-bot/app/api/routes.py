@@ -1,13 +1,17 @@
 """
 Web API路由
 """
+import hashlib
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy import select, update, delete
+from datetime import datetime
+from typing import List, Optional, Tuple
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select, update, delete, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db, DatabaseManager
+from app.database import get_db, DatabaseManager, upsert_insert
 from app.models import TradingPair, Position, TradeLog, SystemConfig, StopLossLog
 from app.api.schemas import (
     TradingPairCreate, TradingPairUpdate, TradingPairResponse,
@@ -31,6 +35,27 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+async def _upsert_system_configs(session: AsyncSession, configs: List[Tuple[str, str, str]]):
+    """单条 INSERT ... ON CONFLICT(key) DO UPDATE 写入多个系统配置
+
+    Args:
+        configs: [(key, value, description), ...]
+    """
+    stmt = upsert_insert(SystemConfig).values([
+        {"key": key, "value": value, "description": desc}
+        for key, value, desc in configs
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SystemConfig.key],
+        set_={
+            "value": stmt.excluded.value,
+            "description": stmt.excluded.description,
+            "updated_at": datetime.utcnow(),
+        }
+    )
+    await session.execute(stmt)
+
+
 # ========== Trading Pairs ==========
 
 @router.get("/trading-pairs", response_model=List[TradingPairResponse])
@@ -45,6 +70,17 @@ async def get_trading_pairs():
         await session.close()
 
 
+def _trading_pair_row(data: TradingPairCreate) -> dict:
+    """将创建请求转换为 trading_pairs 表的列值"""
+    return {
+        "symbol": data.symbol.upper(),
+        "leverage": data.leverage,
+        "strategy_interval": data.strategy_interval,
+        "stop_loss_percent": data.stop_loss_percent,
+        "is_active": data.is_active,
+    }
+
+
 @router.post("/trading-pairs", response_model=TradingPairResponse)
 async def create_trading_pair(data: TradingPairCreate):
     """创建交易对配置"""
@@ -57,17 +93,13 @@ async def create_trading_pair(data: TradingPairCreate):
         if result.scalar_one_or_none():
             raise HTTPException(status_code=400, detail=f"交易对 {data.symbol} 已存在")
         
-        # 创建
-        pair = TradingPair(
-            symbol=data.symbol.upper(),
-            leverage=data.leverage,
-            strategy_interval=data.strategy_interval,
-            stop_loss_percent=data.stop_loss_percent,
-            is_active=data.is_active
+        # 创建（INSERT ... RETURNING 直接取回完整行，无需再 refresh）
+        pair = await session.scalar(
+            insert(TradingPair)
+            .values(_trading_pair_row(data))
+            .returning(TradingPair)
         )
-        session.add(pair)
         await session.commit()
-        await session.refresh(pair)
         
         # 通知配置变更
         if pair.is_active:
@@ -86,32 +118,74 @@ async def create_trading_pair(data: TradingPairCreate):
         await session.close()
 
 
+@router.post("/trading-pairs/bulk", response_model=List[TradingPairResponse])
+async def create_trading_pairs_bulk(data: List[TradingPairCreate]):
+    """批量创建交易对配置（单条INSERT，已存在的交易对会被跳过）
+
+    Returns:
+        实际新建的交易对列表
+    """
+    # 同一请求内重复的symbol以最后一个为准
+    rows = {row["symbol"]: row for row in map(_trading_pair_row, data)}
+    if not rows:
+        return []
+
+    session = await DatabaseManager.get_session()
+    try:
+        result = await session.scalars(
+            upsert_insert(TradingPair)
+            .values(list(rows.values()))
+            .on_conflict_do_nothing(index_elements=["symbol"])
+            .returning(TradingPair)
+        )
+        pairs = result.all()
+        await session.commit()
+
+        # 通知配置变更
+        for pair in pairs:
+            if pair.is_active:
+                await config_manager.notify_observers("trading_pair_added", {
+                    "symbol": pair.symbol,
+                    "interval": pair.strategy_interval
+                })
+
+        return pairs
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await session.close()
+
+
 @router.put("/trading-pairs/{symbol}", response_model=TradingPairResponse)
 async def update_trading_pair(symbol: str, data: TradingPairUpdate):
     """更新交易对配置"""
     session = await DatabaseManager.get_session()
     try:
-        result = await session.execute(
-            select(TradingPair).where(TradingPair.symbol == symbol.upper())
-        )
-        pair = result.scalar_one_or_none()
+        update_data = data.model_dump(exclude_unset=True)
+        where = TradingPair.symbol == symbol.upper()
+        
+        # 仅当更新涉及启用状态或策略周期时，读取这两列的旧值用于判断是否需要通知
+        old_state = None
+        if "is_active" in update_data or "strategy_interval" in update_data:
+            old_state = (await session.execute(
+                select(TradingPair.is_active, TradingPair.strategy_interval).where(where)
+            )).one_or_none()
+        
+        # 单条 UPDATE ... RETURNING 完成更新并取回新值，无需再加载整行
+        if update_data:
+            pair = await session.scalar(
+                update(TradingPair).where(where).values(**update_data).returning(TradingPair)
+            )
+        else:
+            pair = await session.scalar(select(TradingPair).where(where))
         if not pair:
             raise HTTPException(status_code=404, detail=f"交易对 {symbol} 不存在")
         
-        # 记录旧状态
-        old_active = pair.is_active
-        old_interval = pair.strategy_interval
-        
-        # 更新字段
-        update_data = data.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(pair, key, value)
-        
         await session.commit()
-        await session.refresh(pair)
         
-        # 通知配置变更
-        if old_active != pair.is_active or old_interval != pair.strategy_interval:
+        # 通知配置变更（仅在启用状态或策略周期实际变化时）
+        if old_state is not None and (old_state.is_active, old_state.strategy_interval) != (pair.is_active, pair.strategy_interval):
             await config_manager.notify_observers("trading_pair_updated", {
                 "symbol": pair.symbol,
                 "interval": pair.strategy_interval,
@@ -134,13 +208,11 @@ async def delete_trading_pair(symbol: str):
     session = await DatabaseManager.get_session()
     try:
         result = await session.execute(
-            select(TradingPair).where(TradingPair.symbol == symbol.upper())
+            delete(TradingPair).where(TradingPair.symbol == symbol.upper())
         )
-        pair = result.scalar_one_or_none()
-        if not pair:
+        if result.rowcount == 0:
             raise HTTPException(status_code=404, detail=f"交易对 {symbol} 不存在")
         
-        await session.delete(pair)
         await session.commit()
         
         # 通知配置变更
@@ -184,18 +256,7 @@ async def update_binance_config(data: BinanceConfigUpdate):
             ("BINANCE_TESTNET", str(data.testnet), "是否使用测试网")
         ]
         
-        for key, value, desc in configs:
-            result = await session.execute(
-                select(SystemConfig).where(SystemConfig.key == key)
-            )
-            config = result.scalar_one_or_none()
-            if config:
-                config.value = value
-                config.description = desc
-            else:
-                config = SystemConfig(key=key, value=value, description=desc)
-                session.add(config)
-        
+        await _upsert_system_configs(session, configs)
         await session.commit()
         
         # 更新运行时配置（使用明文）
@@ -226,18 +287,7 @@ async def update_telegram_config(data: TelegramConfigUpdate):
         if data.api_hash:
             configs.append(("TG_API_HASH", encrypt(data.api_hash), "Telegram API Hash (加密)"))
         
-        for key, value, desc in configs:
-            result = await session.execute(
-                select(SystemConfig).where(SystemConfig.key == key)
-            )
-            config = result.scalar_one_or_none()
-            if config:
-                config.value = value
-                config.description = desc
-            else:
-                config = SystemConfig(key=key, value=value, description=desc)
-                session.add(config)
-        
+        await _upsert_system_configs(session, configs)
         await session.commit()
         
         # 更新运行时配置（使用明文）
@@ -276,6 +326,35 @@ async def get_positions(status: Optional[str] = Query(None, description="OPEN/CL
         await session.close()
 
 
+@router.get("/positions/stream")
+async def stream_positions(
+    status: Optional[str] = Query(None, description="OPEN/CLOSED"),
+    cursor: Optional[int] = Query(None, description="游标：上一页最后一条记录的id"),
+    limit: int = Query(default=500, ge=1, le=5000)
+):
+    """以NDJSON流式返回仓位列表（按id倒序分页）
+
+    每行一条JSON记录，逐行从数据库读取并发送，不在内存中构建完整列表。
+    下一页请求时将本页最后一条记录的id作为cursor传入。
+    """
+    query = select(Position).order_by(Position.id.desc()).limit(limit)
+    if status:
+        query = query.where(Position.status == status.upper())
+    if cursor is not None:
+        query = query.where(Position.id < cursor)
+
+    async def rows():
+        session = await DatabaseManager.get_session()
+        try:
+            result = await session.stream_scalars(query.execution_options(yield_per=100))
+            async for position in result:
+                yield orjson.dumps(position.to_dict()) + b"\n"
+        finally:
+            await session.close()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
 @router.post("/positions/{symbol}/close", response_model=MessageResponse)
 async def close_position(symbol: str):
     """手动平仓"""
@@ -406,7 +485,9 @@ async def get_account_balance():
 async def test_telegram():
     """测试Telegram通知"""
     try:
-        success = await telegram_service.send_message("🔔 测试消息 - Binance Futures Bot 运行正常!")
+        success = await telegram_service.send_message(
+            "🔔 测试消息 - Binance Futures Bot 运行正常!", wait=True
+        )
         if success:
             return MessageResponse(success=True, message="测试消息已发送")
         else:
@@ -549,22 +630,9 @@ async def update_tg_monitor_config(data: TGMonitorConfigUpdate):
     session = await DatabaseManager.get_session()
     try:
         # 保存到数据库
-        result = await session.execute(
-            select(SystemConfig).where(SystemConfig.key == "MIN_PRICE_CHANGE_PERCENT")
-        )
-        config = result.scalar_one_or_none()
-        
-        if config:
-            config.value = str(data.min_price_change_percent)
-            config.description = "TG频道监控 - 24H价格变化阈值%"
-        else:
-            config = SystemConfig(
-                key="MIN_PRICE_CHANGE_PERCENT",
-                value=str(data.min_price_change_percent),
-                description="TG频道监控 - 24H价格变化阈值%"
-            )
-            session.add(config)
-        
+        await _upsert_system_configs(session, [
+            ("MIN_PRICE_CHANGE_PERCENT", str(data.min_price_change_percent), "TG频道监控 - 24H价格变化阈值%")
+        ])
         await session.commit()
         
         # 更新运行时配置
@@ -585,47 +653,55 @@ async def update_tg_monitor_config(data: TGMonitorConfigUpdate):
 
 # ========== Trading Control ==========
 
+# 总交易开关响应缓存：(序列化后的响应体, ETag)，写入开关时置空
+_trading_enabled_cache: Optional[Tuple[bytes, str]] = None
+
+
 @router.get("/config/trading-enabled")
-async def get_trading_enabled():
-    """获取总交易开关状态"""
-    session = await DatabaseManager.get_session()
-    try:
-        result = await session.execute(
-            select(SystemConfig).where(SystemConfig.key == "TRADING_ENABLED")
-        )
-        config = result.scalar_one_or_none()
+async def get_trading_enabled(request: Request):
+    """获取总交易开关状态
 
-        # 默认为True（开启交易）
-        enabled = True
-        if config and config.value:
-            enabled = config.value.lower() == "true"
+    响应体缓存在进程内存中，客户端携带 If-None-Match 轮询时命中则直接返回304。
+    """
+    global _trading_enabled_cache
 
-        return {"enabled": enabled}
-    finally:
-        await session.close()
+    if _trading_enabled_cache is None:
+        session = await DatabaseManager.get_session()
+        try:
+            result = await session.execute(
+                select(SystemConfig).where(SystemConfig.key == "TRADING_ENABLED")
+            )
+            config = result.scalar_one_or_none()
+
+            # 默认为True（开启交易）
+            enabled = True
+            if config and config.value:
+                enabled = config.value.lower() == "true"
+        finally:
+            await session.close()
+
+        body = orjson.dumps({"enabled": enabled})
+        _trading_enabled_cache = (body, f'"{hashlib.md5(body).hexdigest()}"')
+
+    body, etag = _trading_enabled_cache
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.post("/config/trading-enabled", response_model=MessageResponse)
 async def set_trading_enabled(enabled: bool):
     """设置总交易开关"""
+    global _trading_enabled_cache
+
     session = await DatabaseManager.get_session()
     try:
-        result = await session.execute(
-            select(SystemConfig).where(SystemConfig.key == "TRADING_ENABLED")
-        )
-        config = result.scalar_one_or_none()
-
-        if config:
-            config.value = str(enabled)
-        else:
-            config = SystemConfig(
-                key="TRADING_ENABLED",
-                value=str(enabled),
-                description="总交易开关 - 控制是否允许新开仓"
-            )
-            session.add(config)
-
+        await _upsert_system_configs(session, [
+            ("TRADING_ENABLED", str(enabled), "总交易开关 - 控制是否允许新开仓")
+        ])
         await session.commit()
+        _trading_enabled_cache = None
 
         status = "已开启" if enabled else "已关闭"
         logger.info(f"总交易开关{status}")
@@ -3,20 +3,41 @@
 使用SQLAlchemy异步引擎
 """
 import os
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
 
 # 确保data目录存在
 os.makedirs("data", exist_ok=True)
 
 # 创建异步引擎
+# aiosqlite 文件库默认使用 NullPool，每个会话都要重新打开连接（及其后台线程），
+# 这里显式使用连接池，让各请求/后台任务复用已打开的连接
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    future=True
+    future=True,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=5,
+    max_overflow=10,
+    pool_recycle=3600
 )
 
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """SQLite连接调优：WAL模式下读写互不阻塞，synchronous=NORMAL 减少每次提交的fsync"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")  # 约64MB页缓存
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
 # 创建异步会话工厂
 async_session = async_sessionmaker(
     engine,
@@ -28,6 +49,25 @@ async_session = async_sessionmaker(
 Base = declarative_base()
 
 
+# 支持 INSERT ... ON CONFLICT 的方言及其 insert 构造
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def upsert_insert(table):
+    """按当前引擎方言返回支持 on_conflict_do_update / on_conflict_do_nothing 的 insert 构造
+
+    Raises:
+        NotImplementedError: 数据库方言不支持 ON CONFLICT
+    """
+    dialect = engine.dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        raise NotImplementedError(f"数据库方言 {dialect} 不支持 INSERT ... ON CONFLICT")
+    return _UPSERT_INSERTS[dialect](table)
+
+
 async def init_db():
     """初始化数据库，创建所有表"""
     async with engine.begin() as conn:
@@ -2,15 +2,16 @@
 Binance Futures Trading Bot - 主入口
 """
 import asyncio
+import hashlib
 import logging
 import signal
 from contextlib import asynccontextmanager
+from pathlib import Path
 from typing import List
 
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from sqlalchemy import select
 
 from app.config import settings, config_manager
@@ -18,6 +19,7 @@ from app.database import init_db, DatabaseManager
 from app.models import TradingPair, SystemConfig
 from app.api.routes import router as api_router
 from app.services.binance_api import binance_api
+from app.services.coingecko_api import coingecko_api
 from app.services.binance_ws import binance_ws, KlineData
 from app.services.strategy import ema_strategy, ema_advanced_strategy, SignalType
 from app.services.position_manager import position_manager
@@ -148,7 +150,7 @@ class TradingEngine:
                     conditions_detail = ""
                     if signal.conditions:
                         conditions_detail = " | 条件: " + ", ".join([
-                            f"{name}:{'✓' if cond['pass'] else '✗'}({cond['value']})"
+                            f"{name}:{'-' if cond['pass'] is None else '✓' if cond['pass'] else '✗'}({cond['value']})"
                             for name, cond in signal.conditions.items()
                         ])
                     logger.info(f"[{symbol}] 策略分析第{self._analysis_count[symbol]}次: {signal.message}{conditions_detail}")
@@ -423,8 +425,10 @@ async def lifespan(app: FastAPI):
     await binance_ws.stop()
     await oi_monitor.stop()  # 停止涨跌幅监控
     await binance_api.close()
+    await coingecko_api.close()
     
     await telegram_service.send_message("🛑 **Binance Futures Bot 已停止**")
+    await telegram_service.stop()  # 发送完队列中剩余的消息
     
     logger.info("Bot 已停止")
 
@@ -434,14 +438,16 @@ app = FastAPI(
     title="Binance Futures Bot",
     description="币安合约交易机器人",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # orjson序列化，比标准库json快数倍
 )
 
 # 挂载静态文件
 # app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# 模板
-templates = Jinja2Templates(directory="app/templates")
+# 主页为纯静态HTML（无模板变量），启动时读取一次并计算ETag，浏览器可用304复用缓存
+INDEX_HTML = (Path(__file__).parent / "templates" / "index.html").read_bytes()
+INDEX_ETAG = f'"{hashlib.md5(INDEX_HTML).hexdigest()}"'
 
 # 注册API路由
 app.include_router(api_router, prefix="/api", tags=["API"])
@@ -450,7 +456,10 @@ app.include_router(api_router, prefix="/api", tags=["API"])
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     """主页"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    headers = {"ETag": INDEX_ETAG, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == INDEX_ETAG:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(INDEX_HTML, headers=headers)
 
 
 @app.get("/health")
@@ -49,9 +49,9 @@ class TradingPair(Base):
             "base_leverage": self.base_leverage,
             "current_leverage": self.current_leverage,
             "atr_volatility": self.atr_volatility,
-            "last_volatility_check": self.last_volatility_check.isoformat() if self.last_volatility_check else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            "last_volatility_check": self.last_volatility_check,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
         }
 
 
@@ -87,7 +87,7 @@ class Position(Base):
     partial_close_quantity: Mapped[float] = mapped_column(Float, nullable=True)  # 部分平仓数量
     remaining_quantity: Mapped[float] = mapped_column(Float, nullable=True)  # 剩余数量
 
-    status: Mapped[str] = mapped_column(String(20), default="OPEN")  # OPEN/CLOSED
+    status: Mapped[str] = mapped_column(String(20), default="OPEN", index=True)  # OPEN/CLOSED
     pnl: Mapped[float] = mapped_column(Float, nullable=True)
     pnl_percent: Mapped[float] = mapped_column(Float, nullable=True)
     opened_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -112,8 +112,8 @@ class Position(Base):
             "status": self.status,
             "pnl": self.pnl,
             "pnl_percent": self.pnl_percent,
-            "opened_at": self.opened_at.isoformat() if self.opened_at else None,
-            "closed_at": self.closed_at.isoformat() if self.closed_at else None,
+            "opened_at": self.opened_at,
+            "closed_at": self.closed_at,
             "close_reason": self.close_reason
         }
 
@@ -178,7 +178,7 @@ class StopLossLog(Base):
             "is_trailing": self.is_trailing,
             "adjust_reason": self.adjust_reason,
             "adjust_detail": self.adjust_detail,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": self.created_at
         }
 
 
@@ -4,12 +4,15 @@
 """
 import asyncio
 import logging
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
 from decimal import Decimal, ROUND_DOWN
 import httpx
+import numpy as np
+import orjson
 import hmac
 import hashlib
 import time
+from operator import itemgetter
 from urllib.parse import urlencode
 
 from binance.client import Client
@@ -19,18 +22,22 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+USDT_SUFFIX = "USDT"  # USDT永续合约交易对后缀
+
 
 class BinanceAPI:
     """币安期货API客户端"""
 
     BASE_URL = "https://fapi.binance.com"
     TESTNET_URL = "https://testnet.binancefuture.com"
+    TICKER_CACHE_TTL = 30  # 全量24hr行情缓存有效期（秒）
 
     def __init__(self):
         self._exchange_info: Dict = {}
         self._symbol_info: Dict[str, Dict] = {}
         self._client: Optional[httpx.AsyncClient] = None
         self._binance_client: Optional[Client] = None
+        self._ticker_cache: Optional[Tuple[float, List[dict]]] = None  # (获取时间, 全量24hr行情)
 
     def _get_binance_client(self) -> Client:
         """获取python-binance客户端（每次调用都创建新实例以获取最新配置）"""
@@ -57,7 +64,12 @@ class BinanceAPI:
     async def get_client(self) -> httpx.AsyncClient:
         """获取HTTP客户端"""
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=30.0)
+            # HTTP/2多路复用 + 长连接池，复用TLS连接避免每次请求握手
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+            )
         return self._client
     
     async def close(self):
@@ -106,7 +118,8 @@ class BinanceAPI:
                 raise ValueError(f"Unsupported method: {method}")
             
             response.raise_for_status()
-            return response.json()
+            # orjson直接解析原始字节，比httpx内置的json解码更快（全量24hr行情等大响应）
+            return orjson.loads(response.content)
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP请求错误: 状态码={e.response.status_code}, 响应={e.response.text}")
             raise
@@ -291,13 +304,24 @@ class BinanceAPI:
         result = await self._request("GET", "/fapi/v1/ticker/price", {"symbol": symbol})
         return float(result["price"])
     
-    async def get_klines(self, symbol: str, interval: str, limit: int = 200) -> List[list]:
-        """获取K线数据"""
+    async def get_klines(self, symbol: str, interval: str, limit: int = 200,
+                         start_time: Optional[int] = None,
+                         end_time: Optional[int] = None) -> List[list]:
+        """获取K线数据
+
+        Args:
+            start_time: 起始时间（毫秒时间戳，可选）
+            end_time: 结束时间（毫秒时间戳，可选）
+        """
         params = {
             "symbol": symbol,
             "interval": interval,
             "limit": limit
         }
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
         return await self._request("GET", "/fapi/v1/klines", params)
     
     async def place_market_order(self, symbol: str, side: str, quantity: float, 
@@ -525,10 +549,16 @@ class BinanceAPI:
         params = {}
         if symbol:
             params["symbol"] = symbol
+        elif self._ticker_cache and time.monotonic() - self._ticker_cache[0] < self.TICKER_CACHE_TTL:
+            # 短时间内重复获取全量行情（如手动检查紧跟定时检查）直接复用缓存
+            return self._ticker_cache[1]
+
         result = await self._request("GET", "/fapi/v1/ticker/24hr", params)
         # 如果是单个symbol，返回的是dict，转为list
         if isinstance(result, dict):
             return [result]
+        if not symbol:
+            self._ticker_cache = (time.monotonic(), result)
         return result
     
     async def get_high_change_symbols(self, min_change_percent: float = 30.0) -> List[dict]:
@@ -542,35 +572,65 @@ class BinanceAPI:
                 包含字段: symbol, priceChangePercent, lastPrice, volume, quoteVolume
         """
         all_tickers = await self.get_24hr_ticker()
-        
-        # 筛选USDT永续合约且涨跌幅绝对值 >= min_change_percent 的币种
-        high_change = []
-        for ticker in all_tickers:
-            symbol = ticker.get("symbol", "")
-            # 只看USDT永续合约
-            if not symbol.endswith("USDT"):
-                continue
-            
+
+        # 只看USDT永续合约
+        tickers = [t for t in all_tickers if t.get("symbol", "").endswith(USDT_SUFFIX)]
+
+        try:
+            change = np.array([t.get("priceChangePercent", 0) for t in tickers], dtype=np.float64)
+        except (ValueError, TypeError):
+            # 存在无法解析的涨跌幅时退回逐条筛选
+            high_change = self._filter_high_change_scalar(tickers, min_change_percent)
+        else:
+            # 向量化筛选涨跌幅绝对值 >= min_change_percent 的币种，并按绝对值降序（稳定排序）
+            abs_change = np.abs(change)
+            idx = np.flatnonzero(abs_change >= min_change_percent)
+            idx = idx[np.argsort(-abs_change[idx], kind="stable")]
+
+            # 只为筛选后的少量币种构建字典
+            high_change = []
+            for i in idx:
+                row = self._high_change_row(tickers[i], float(change[i]))
+                if row is not None:
+                    high_change.append(row)
+
+        logger.info(f"找到 {len(high_change)} 个涨跌幅绝对值 >= {min_change_percent}% 的币种")
+        return high_change
+
+    @staticmethod
+    def _high_change_row(ticker: dict, change_percent: float) -> Optional[dict]:
+        """将单条24hr行情转换为涨跌幅结果行，字段无法解析时返回None"""
+        try:
+            return {
+                "symbol": ticker["symbol"],
+                "priceChangePercent": change_percent,
+                "lastPrice": float(ticker.get("lastPrice", 0)),
+                "highPrice": float(ticker.get("highPrice", 0)),
+                "lowPrice": float(ticker.get("lowPrice", 0)),
+                "volume": float(ticker.get("volume", 0)),
+                "quoteVolume": float(ticker.get("quoteVolume", 0)),
+            }
+        except (ValueError, TypeError):
+            return None
+
+    def _filter_high_change_scalar(self, tickers: List[dict], min_change_percent: float) -> List[dict]:
+        """逐条筛选涨跌幅（向量化解析失败时的回退路径）"""
+        # (涨跌幅绝对值, 结果行)，绝对值只计算一次，排序时无需再查字典
+        matches = []
+        for ticker in tickers:
             try:
                 change_percent = float(ticker.get("priceChangePercent", 0))
-                if abs(change_percent) >= min_change_percent:
-                    high_change.append({
-                        "symbol": symbol,
-                        "priceChangePercent": change_percent,
-                        "lastPrice": float(ticker.get("lastPrice", 0)),
-                        "highPrice": float(ticker.get("highPrice", 0)),
-                        "lowPrice": float(ticker.get("lowPrice", 0)),
-                        "volume": float(ticker.get("volume", 0)),
-                        "quoteVolume": float(ticker.get("quoteVolume", 0)),
-                    })
             except (ValueError, TypeError):
                 continue
-        
-        # 按涨跌幅绝对值降序排列
-        high_change.sort(key=lambda x: abs(x["priceChangePercent"]), reverse=True)
+            abs_change = abs(change_percent)
+            if abs_change >= min_change_percent:
+                row = self._high_change_row(ticker, change_percent)
+                if row is not None:
+                    matches.append((abs_change, row))
 
-        logger.info(f"找到 {len(high_change)} 个涨跌幅绝对值 >= {min_change_percent}% 的币种")
-        return high_change
+        # 按涨跌幅绝对值降序排列
+        matches.sort(key=itemgetter(0), reverse=True)
+        return [row for _, row in matches]
 
     async def get_income_history(self, symbol: str = None, income_type: str = None,
                                   start_time: int = None, end_time: int = None,
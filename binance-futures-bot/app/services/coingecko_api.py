@@ -17,6 +17,18 @@ class CoinGeckoAPI:
         self.base_url = "https://api.coingecko.com/api/v3"
         self._cache: Dict[str, Dict] = {}  # 市值缓存
         self._cache_ttl = timedelta(hours=1)  # 缓存1小时
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取复用的HTTP会话（保持连接池，避免每次请求重新建立TLS连接）"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        return self._session
+
+    async def close(self):
+        """关闭HTTP会话"""
+        if self._session and not self._session.closed:
+            await self._session.close()
 
     def _binance_symbol_to_coingecko_id(self, binance_symbol: str) -> str:
         """转换币安交易对到CoinGecko ID
@@ -119,34 +131,34 @@ class CoinGeckoAPI:
                 "sparkline": "false"
             }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        market_data = data.get("market_data", {})
-
-                        result = {
-                            "market_cap_usd": market_data.get("market_cap", {}).get("usd", 0),
-                            "market_cap_rank": data.get("market_cap_rank", 999),
-                            "price": market_data.get("current_price", {}).get("usd", 0),
-                            "volume_24h": market_data.get("total_volume", {}).get("usd", 0),
-                            "circulating_supply": market_data.get("circulating_supply", 0),
-                        }
-
-                        # 缓存结果
-                        self._cache[binance_symbol] = {
-                            "data": result,
-                            "cached_at": datetime.now()
-                        }
-
-                        logger.info(f"[{binance_symbol}] 获取市值: ${result['market_cap_usd']:,.0f} (排名#{result['market_cap_rank']})")
-                        return result
-                    elif response.status == 404:
-                        logger.warning(f"[{binance_symbol}] CoinGecko未找到币种ID: {coingecko_id}")
-                        return None
-                    else:
-                        logger.error(f"[{binance_symbol}] CoinGecko API错误: {response.status}")
-                        return None
+            session = await self.get_session()
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    market_data = data.get("market_data", {})
+
+                    result = {
+                        "market_cap_usd": market_data.get("market_cap", {}).get("usd", 0),
+                        "market_cap_rank": data.get("market_cap_rank", 999),
+                        "price": market_data.get("current_price", {}).get("usd", 0),
+                        "volume_24h": market_data.get("total_volume", {}).get("usd", 0),
+                        "circulating_supply": market_data.get("circulating_supply", 0),
+                    }
+
+                    # 缓存结果
+                    self._cache[binance_symbol] = {
+                        "data": result,
+                        "cached_at": datetime.now()
+                    }
+
+                    logger.info(f"[{binance_symbol}] 获取市值: ${result['market_cap_usd']:,.0f} (排名#{result['market_cap_rank']})")
+                    return result
+                elif response.status == 404:
+                    logger.warning(f"[{binance_symbol}] CoinGecko未找到币种ID: {coingecko_id}")
+                    return None
+                else:
+                    logger.error(f"[{binance_symbol}] CoinGecko API错误: {response.status}")
+                    return None
 
         except aiohttp.ClientError as e:
             logger.error(f"[{binance_symbol}] CoinGecko API请求失败: {e}")
@@ -5,7 +5,7 @@
 import logging
 from typing import Optional, Dict
 from app.services.coingecko_api import coingecko_api
-from app.utils.indicators import technical_indicators
+from app.utils.indicators import Klines, KlinesLike, technical_indicators
 
 logger = logging.getLogger(__name__)
 
@@ -57,7 +57,7 @@ class LeverageManager:
     async def calculate_leverage(
         self,
         symbol: str,
-        klines: Optional[list] = None,
+        klines: Optional[KlinesLike] = None,
         volatility: Optional[float] = None,
         adx: Optional[float] = None
     ) -> Dict:
@@ -81,7 +81,7 @@ class LeverageManager:
 
         Args:
             symbol: 交易对
-            klines: K线数据（可选）
+            klines: K线数据或已转换的Klines（可选）
             volatility: ATR年化波动率（可选）
             adx: ADX值（可选）
 
@@ -101,10 +101,12 @@ class LeverageManager:
 
         # 计算技术指标
         if klines and len(klines) >= 200:
+            # 波动率与ADX共用一次转换结果
+            bars = Klines.from_raw(klines)
             if volatility is None:
-                volatility = technical_indicators.calculate_atr_volatility(klines, period=14)
+                volatility = technical_indicators.calculate_atr_volatility(bars, period=14)
             if adx is None:
-                adx_values, _, _ = technical_indicators.calculate_adx(klines, period=14)
+                adx_values, _, _ = technical_indicators.calculate_adx(bars, period=14)
                 adx = adx_values[-1] if adx_values else 0
         else:
             volatility = volatility or 0
@@ -6,7 +6,7 @@ import asyncio
 import logging
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -25,6 +25,13 @@ class PositionManager:
     
     def __init__(self):
         self._positions: Dict[str, Position] = {}  # 内存缓存
+        self._open_positions: Tuple[Position, ...] = ()  # 开放仓位视图，仓位变动时刷新
+    
+    def _refresh_open_positions(self):
+        """刷新开放仓位视图"""
+        self._open_positions = tuple(
+            pos for pos in self._positions.values() if pos.status == "OPEN"
+        )
     
     async def load_positions(self):
         """从数据库加载开放仓位"""
@@ -36,6 +43,7 @@ class PositionManager:
             positions = result.scalars().all()
             for pos in positions:
                 self._positions[pos.symbol] = pos
+            self._refresh_open_positions()
             logger.info(f"已加载 {len(self._positions)} 个持仓")
         finally:
             await session.close()
@@ -163,6 +171,7 @@ class PositionManager:
             
             # 缓存
             self._positions[symbol] = position
+            self._refresh_open_positions()
             
             # 记录交易日志
             trade_log = TradeLog(
@@ -405,6 +414,7 @@ class PositionManager:
             
             # 从缓存移除
             del self._positions[symbol]
+            self._refresh_open_positions()
             
             # 记录交易日志
             trade_log = TradeLog(
@@ -636,6 +646,7 @@ class PositionManager:
             
             # 从缓存移除
             del self._positions[symbol]
+            self._refresh_open_positions()
             
             # 记录交易日志
             trade_log = TradeLog(
@@ -682,6 +693,10 @@ class PositionManager:
     def get_all_positions(self) -> List[Position]:
         """获取所有仓位"""
         return list(self._positions.values())
+    
+    def get_open_positions(self) -> Tuple[Position, ...]:
+        """获取所有开放仓位（缓存视图，无需逐个过滤状态）"""
+        return self._open_positions
 
 
 # 全局实例
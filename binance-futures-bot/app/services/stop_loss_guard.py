@@ -5,6 +5,7 @@
 import asyncio
 import json
 import logging
+import time
 from typing import Optional, Dict, List
 from decimal import Decimal
 
@@ -25,6 +26,16 @@ DEFAULT_TRAILING_CONFIG = {
     "level_3": {"profit_min": 4.0, "profit_max": None, "lock_profit": 1.9, "trailing_enabled": True, "trailing_percent": 1.5, "partial_close_percent": 50.0}
 }
 
+# 止损类订单类型
+STOP_ORDER_TYPES = frozenset(("STOP_MARKET", "STOP", "STOP_LOSS", "STOP_LOSS_LIMIT"))
+
+
+def _filter_stop_orders(orders: List[dict]) -> List[dict]:
+    """筛选止损单（算法订单使用orderType，普通订单使用type）"""
+    if not orders:
+        return []
+    return [o for o in orders if (o.get("type") or o.get("orderType")) in STOP_ORDER_TYPES]
+
 
 class StopLossGuard:
     """止损订单守护器
@@ -320,7 +331,7 @@ class StopLossGuard:
                 try:
                     open_orders = await binance_api.get_open_orders(symbol)
                     if open_orders:
-                        stop_orders = [o for o in open_orders if (o.get("type") or o.get("orderType")) in ("STOP_MARKET", "STOP", "STOP_LOSS", "STOP_LOSS_LIMIT")]
+                        stop_orders = _filter_stop_orders(open_orders)
                         for order in stop_orders:
                             order_id = order.get("algoId") or order.get("orderId")
                             try:
@@ -352,7 +363,7 @@ class StopLossGuard:
                         logger.info(f"[{symbol}] 挂单详情: type={order_type}, ID={order_id}, stopPrice={stop_price}")
                 # 检查所有类型的止损单（算法订单和普通订单）
                 # 算法订单使用orderType，普通订单使用type
-                stop_orders = [o for o in open_orders if (o.get("type") or o.get("orderType")) in ("STOP_MARKET", "STOP", "STOP_LOSS", "STOP_LOSS_LIMIT")]
+                stop_orders = _filter_stop_orders(open_orders)
                 existing_stop_orders_count = len(stop_orders)
                 if stop_orders:
                     # 算法订单使用triggerPrice，普通订单使用stopPrice
@@ -371,18 +382,9 @@ class StopLossGuard:
                     logger.debug(f"[{symbol}] 当前盈利未达到调整止损的条件，保持现有止损单")
                     return
 
-                # 获取精度信息用于比较
-                precision_info = await binance_api.get_symbol_precision(symbol)
-                formatted_current = binance_api.format_price(current_stop_price, precision_info)
-                formatted_new = binance_api.format_price(new_stop_price, precision_info)
-
-                # 如果新止损价格与当前相同（考虑精度），不需要调整
-                if formatted_current == formatted_new:
-                    logger.debug(f"[{symbol}] 止损价格未变化({formatted_current})，跳过调整")
-                    return
-
                 # 检查是否需要调整（做多时新止损应该更高，做空时新止损应该更低）
                 # 只有新止损价格更有利时才调整，避免不必要的刷新
+                # 先做无需精度信息的方向比较，再做格式化价格比较
                 if parsed_pos['side'] == "LONG":
                     if new_stop_price <= current_stop_price:
                         logger.debug(f"[{symbol}] 新止损价格({new_stop_price})不高于当前止损({current_stop_price})，跳过调整")
@@ -392,6 +394,16 @@ class StopLossGuard:
                         logger.debug(f"[{symbol}] 新止损价格({new_stop_price})不低于当前止损({current_stop_price})，跳过调整")
                         return
 
+                # 获取精度信息用于比较
+                precision_info = await binance_api.get_symbol_precision(symbol)
+                formatted_current = binance_api.format_price(current_stop_price, precision_info)
+                formatted_new = binance_api.format_price(new_stop_price, precision_info)
+
+                # 如果新止损价格与当前相同（考虑精度），不需要调整
+                if formatted_current == formatted_new:
+                    logger.debug(f"[{symbol}] 止损价格未变化({formatted_current})，跳过调整")
+                    return
+
                 # 只有在新止损价格更有利时才调整
                 logger.info(f"[{symbol}] 需要调整止损: {current_stop_price} -> {new_stop_price}")
                 await self._adjust_stop_loss(
@@ -437,7 +449,7 @@ class StopLossGuard:
                 return
             
             # 找出止损单（算法订单使用orderType，普通订单使用type）
-            stop_orders = [o for o in all_orders if (o.get("type") or o.get("orderType")) in ("STOP_MARKET", "STOP", "STOP_LOSS", "STOP_LOSS_LIMIT")]
+            stop_orders = _filter_stop_orders(all_orders)
             
             for order in stop_orders:
                 order_symbol = order.get("symbol")
@@ -459,6 +471,8 @@ class StopLossGuard:
         """止损守护检查循环"""
         logger.info("止损守护检查循环已启动")
         check_count = 0
+        # 按固定节拍调度，避免检查耗时（持仓数量越多越久）累积成漂移
+        next_run = time.monotonic()
 
         while self._running:
             try:
@@ -486,7 +500,7 @@ class StopLossGuard:
                     # 清理所有挂单（因为没有持仓了）
                     try:
                         all_orders = await binance_api.get_open_orders()
-                        stop_orders = [o for o in all_orders if (o.get("type") or o.get("orderType")) in ("STOP_MARKET", "STOP", "STOP_LOSS", "STOP_LOSS_LIMIT")]
+                        stop_orders = _filter_stop_orders(all_orders)
                         for order in stop_orders:
                             order_symbol = order.get("symbol")
                             order_id = order.get("algoId") or order.get("orderId")
@@ -501,11 +515,15 @@ class StopLossGuard:
                     except Exception as e:
                         logger.warning(f"清理挂单失败: {e}")
 
-                await asyncio.sleep(self._check_interval)
-
             except Exception as e:
                 logger.error(f"止损守护检查循环错误: {e}")
-                await asyncio.sleep(self._check_interval)
+
+            next_run += self._check_interval
+            now = time.monotonic()
+            if next_run < now:
+                # 本轮耗时超过一个间隔，从当前时间重新计时，避免连续补跑
+                next_run = now
+            await asyncio.sleep(next_run - now)
 
     async def start(self):
         """启动止损守护"""
@@ -8,9 +8,27 @@ from dataclasses import dataclass
 from enum import Enum
 import numpy as np
 
+from app.utils.jit import njit
+
 logger = logging.getLogger(__name__)
 
 
+@njit(cache=True, fastmath=True)
+def _ema_kernel(prices: np.ndarray, period: int, multiplier: float) -> np.ndarray:
+    """EMA递推内核（numba编译），前period-1个值为NaN"""
+    n = len(prices)
+    ema = np.empty(n, dtype=np.float32)
+    ema[:period - 1] = np.nan
+
+    # 使用SMA作为第一个EMA值
+    ema[period - 1] = prices[:period].mean()
+
+    for i in range(period, n):
+        ema[i] = prices[i] * multiplier + ema[i - 1] * (1 - multiplier)
+
+    return ema
+
+
 class SignalType(Enum):
     """信号类型"""
     NONE = "NONE"
@@ -50,29 +68,25 @@ class EMAStrategy:
         self.lookback = lookback
     
     @staticmethod
-    def calculate_ema(prices: List[float], period: int) -> List[float]:
+    def calculate_ema(prices: List[float], period: int) -> np.ndarray:
         """计算EMA
         
         EMA = 价格 * k + 昨日EMA * (1 - k)
         k = 2 / (period + 1)
+
+        返回float32数组，前period-1个值为NaN（尚未有效）
         """
         if len(prices) < period:
-            return []
-        
-        prices = np.array(prices)
-        ema = np.zeros(len(prices))
-        
-        # 使用SMA作为第一个EMA值
-        ema[period - 1] = np.mean(prices[:period])
+            return np.empty(0, dtype=np.float32)
         
+        prices = np.asarray(prices, dtype=np.float64)
+
         # 计算乘数
         multiplier = 2 / (period + 1)
+
+        ema = _ema_kernel(prices, period, multiplier)
         
-        # 计算后续EMA值
-        for i in range(period, len(prices)):
-            ema[i] = prices[i] * multiplier + ema[i - 1] * (1 - multiplier)
-        
-        return ema.tolist()
+        return ema
     
     def detect_cross(self, ema_fast: List[float], ema_slow: List[float], 
                      index: int) -> Optional[str]:
@@ -148,8 +162,11 @@ class EMAStrategy:
                 message=f"K线数据不足: {len(klines)} < {min_klines}"
             )
 
-        # 提取收盘价
-        close_prices = [float(k[4]) for k in klines]
+        from app.utils.indicators import Klines
+
+        # K线转换为列式数组，直接取收盘价
+        bars = Klines.from_raw(klines)
+        close_prices = bars.close
 
         # 计算EMA
         ema_fast = self.calculate_ema(close_prices, self.fast_period)
@@ -157,9 +174,9 @@ class EMAStrategy:
 
         # 当前K线索引(最后一根已收盘的K线)
         current_index = len(close_prices) - 1
-        current_price = close_prices[current_index]
-        current_ema_fast = ema_fast[current_index] if ema_fast else 0
-        current_ema_slow = ema_slow[current_index] if ema_slow else 0
+        current_price = float(close_prices[current_index])
+        current_ema_fast = float(ema_fast[current_index]) if len(ema_fast) else 0
+        current_ema_slow = float(ema_slow[current_index]) if len(ema_slow) else 0
 
         # 初始化条件检测结果
         conditions = {}
@@ -297,7 +314,7 @@ class EMAAdvancedStrategy:
         self.max_crosses = max_crosses
 
     @staticmethod
-    def calculate_ema(prices: List[float], period: int) -> List[float]:
+    def calculate_ema(prices: List[float], period: int) -> np.ndarray:
         """计算EMA（复用基础策略的方法）"""
         return EMAStrategy.calculate_ema(prices, period)
 
@@ -346,7 +363,7 @@ class EMAAdvancedStrategy:
             StrategySignal
         """
         # 导入技术指标
-        from app.utils.indicators import technical_indicators
+        from app.utils.indicators import Klines, technical_indicators
 
         # 至少需要 ema_slow + lookback + adx_period + 2 根K线
         min_klines = self.ema_slow + self.lookback + self.adx_period + 2
@@ -361,8 +378,9 @@ class EMAAdvancedStrategy:
                 message=f"K线数据不足: {len(klines)} < {min_klines}"
             )
 
-        # 提取收盘价
-        close_prices = [float(k[4]) for k in klines]
+        # K线只转换一次，EMA与各指标共用
+        bars = Klines.from_raw(klines)
+        close_prices = bars.close
 
         # 计算EMA6, EMA51, EMA200
         ema6 = self.calculate_ema(close_prices, self.ema_fast)
@@ -371,10 +389,10 @@ class EMAAdvancedStrategy:
 
         # 当前K线索引
         current_index = len(close_prices) - 1
-        current_price = close_prices[current_index]
-        current_ema6 = ema6[current_index] if ema6 else 0
-        current_ema51 = ema51[current_index] if ema51 else 0
-        current_ema200 = ema200[current_index] if ema200 else 0
+        current_price = float(close_prices[current_index])
+        current_ema6 = float(ema6[current_index]) if len(ema6) else 0
+        current_ema51 = float(ema51[current_index]) if len(ema51) else 0
+        current_ema200 = float(ema200[current_index]) if len(ema200) else 0
 
         # 初始化条件检测结果
         conditions = {}
@@ -412,34 +430,38 @@ class EMAAdvancedStrategy:
                 "value": f"价格({current_price:.6f}) {'<' if price_vs_ema200_ok else '>='} EMA200({current_ema200:.6f}) [已禁用]"
             }
 
-        # 条件3: 计算ADX并检查是否≥25 [暂时禁用]
-        adx_values, plus_di, minus_di = technical_indicators.calculate_adx(klines, self.adx_period)
-        current_adx = 0
-        adx_ok = False
-        if adx_values and len(adx_values) > 0:
-            current_adx = adx_values[-1]
-            adx_ok = current_adx >= self.adx_threshold
-        conditions["ADX强度"] = {
-            "pass": True,  # 暂时禁用此条件，始终通过
-            "value": f"ADX({current_adx:.2f}) {'>=' if adx_ok else '<'} {self.adx_threshold} [已禁用]"
-        }
+        # 条件5: 统计前N根K线的交叉次数
+        cross_count = self.count_crosses(ema6, ema51, current_index)
+        cross_count_ok = cross_count <= self.max_crosses
 
         # 条件4: 检查成交量是否突破
         volume_ok = technical_indicators.check_volume_surge(
-            klines, self.volume_period, self.volume_multiplier
+            bars, self.volume_period, self.volume_multiplier
         )
-        current_volume = float(klines[-1][5])
-        volume_ma_list = technical_indicators.calculate_volume_average(klines, self.volume_period)
-        avg_volume = volume_ma_list[-1] if volume_ma_list else 0
+        current_volume = float(bars.volume[-1])
+        avg_volume = technical_indicators.calculate_last_volume_average(bars, self.volume_period) or 0
         volume_threshold = avg_volume * self.volume_multiplier
+
+        # 条件3: 计算ADX并检查是否≥25 [暂时禁用]
+        # ADX计算开销最大，成交量或交叉频率已不满足时信号必然为NONE，直接跳过
+        if volume_ok and cross_count_ok:
+            adx_values, plus_di, minus_di = technical_indicators.calculate_adx(bars, self.adx_period)
+            current_adx = 0
+            adx_ok = False
+            if adx_values and len(adx_values) > 0:
+                current_adx = adx_values[-1]
+                adx_ok = current_adx >= self.adx_threshold
+            conditions["ADX强度"] = {
+                "pass": True,  # 暂时禁用此条件，始终通过
+                "value": f"ADX({current_adx:.2f}) {'>=' if adx_ok else '<'} {self.adx_threshold} [已禁用]"
+            }
+        else:
+            conditions["ADX强度"] = {"pass": None, "value": "已跳过(前置条件未满足)"}
+
         conditions["成交量突破"] = {
             "pass": volume_ok,
             "value": f"当前({current_volume:.0f}) {'>=' if volume_ok else '<'} 阈值({volume_threshold:.0f}, {self.volume_multiplier}x均量)"
         }
-
-        # 条件5: 统计前N根K线的交叉次数
-        cross_count = self.count_crosses(ema6, ema51, current_index)
-        cross_count_ok = cross_count <= self.max_crosses
         conditions["交叉频率"] = {
             "pass": cross_count_ok,
             "value": f"前{self.lookback}根交叉{cross_count}次 {'<=' if cross_count_ok else '>'} {self.max_crosses}次"
@@ -474,7 +496,7 @@ class EMAAdvancedStrategy:
                 )
         else:
             # 有条件不满足
-            failed_conditions = [name for name, cond in conditions.items() if not cond["pass"]]
+            failed_conditions = [name for name, cond in conditions.items() if cond["pass"] is False]
             return StrategySignal(
                 signal_type=SignalType.NONE,
                 symbol=symbol,
@@ -2,18 +2,37 @@
 Telegram服务模块
 包含消息推送功能
 """
+import asyncio
 import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
 from app.config import settings, config_manager
+from app.database import DatabaseManager, upsert_insert
+from app.models import TradingPair
 
 logger = logging.getLogger(__name__)
 
 
 class TelegramService:
-    """Telegram服务 - 消息推送"""
+    """Telegram服务 - 消息推送
+
+    消息先放入有界队列，由单个后台worker发送，调用方无需等待Telegram接口返回
+    """
+    
+    # Markdown特殊字符转义表（单次translate完成全部转义）
+    _ESCAPE_TABLE = str.maketrans({c: f"\\{c}" for c in "_*[]()~`>#+-=|{}.!"})
+    
+    QUEUE_MAXSIZE = 1000
+    COALESCE_THRESHOLD = 5  # 积压超过该数量时合并为一条消息发送
+    MAX_MESSAGE_LENGTH = 4096  # Telegram单条消息长度上限
     
     def __init__(self):
         self._bot = None
         self._initialized = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
     
     async def initialize(self):
         """初始化Telegram Bot"""
@@ -25,14 +44,43 @@ class TelegramService:
             from telegram import Bot
             self._bot = Bot(token=settings.TG_BOT_TOKEN)
             self._initialized = True
+            self._start_worker()
             logger.info("Telegram Bot 已初始化")
             return True
         except Exception as e:
             logger.error(f"Telegram Bot 初始化失败: {e}")
             return False
     
-    async def send_message(self, message: str, parse_mode: str = "Markdown"):
-        """发送消息到Telegram"""
+    def _start_worker(self):
+        """启动后台发送worker（重复初始化时不会重复启动）"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.QUEUE_MAXSIZE)
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker())
+    
+    async def stop(self):
+        """停止后台worker，退出前尽量发送完队列中的消息"""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=10)
+            except asyncio.TimeoutError:
+                logger.warning(f"Telegram 队列未发送完毕，丢弃 {self._queue.qsize()} 条消息")
+        
+        if self._worker_task:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+    
+    async def send_message(self, message: str, parse_mode: str = "Markdown", wait: bool = False) -> bool:
+        """发送消息到Telegram
+        
+        默认放入队列后立即返回：返回True仅表示消息已进入发送队列，不代表Telegram已送达，
+        发送失败只会记录日志；Bot未初始化或队列已满时返回False。
+        需要知道实际发送结果时传入 wait=True，直接发送并返回是否成功。
+        """
         if not self._initialized:
             await self.initialize()
         
@@ -40,6 +88,73 @@ class TelegramService:
             logger.warning("Telegram Bot 未初始化，跳过消息发送")
             return False
         
+        if wait:
+            return await self._send_now(message, parse_mode)
+        
+        try:
+            self._queue.put_nowait((message, parse_mode))
+            return True
+        except asyncio.QueueFull:
+            logger.error(f"Telegram 发送队列已满({self.QUEUE_MAXSIZE})，丢弃消息: {message[:50]}")
+            return False
+    
+    async def _worker(self):
+        """后台发送循环"""
+        while True:
+            batch = [await self._queue.get()]
+            # 积压较多时一次取出，合并发送以避开Telegram频率限制
+            if self._queue.qsize() >= self.COALESCE_THRESHOLD:
+                while not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+            
+            try:
+                for parse_mode, messages in self._coalesce(batch):
+                    await self._send_group(messages, parse_mode)
+            except Exception as e:
+                logger.error(f"Telegram 发送worker异常: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _coalesce(self, batch: List[Tuple[str, str]]) -> List[Tuple[str, List[str]]]:
+        """将相邻的同parse_mode消息分组，每组合并后不超过Telegram长度上限
+
+        Returns:
+            [(parse_mode, 组内原始消息列表), ...]
+        """
+        groups: List[Tuple[str, List[str]]] = []
+        group_length = 0
+        for message, parse_mode in batch:
+            if groups:
+                last_mode, last_messages = groups[-1]
+                if (last_mode == parse_mode and
+                        group_length + len(message) + 2 <= self.MAX_MESSAGE_LENGTH):
+                    last_messages.append(message)
+                    group_length += len(message) + 2
+                    continue
+            groups.append((parse_mode, [message]))
+            group_length = len(message)
+        return groups
+    
+    async def _send_group(self, messages: List[str], parse_mode: str) -> bool:
+        """发送一组消息：多条时先合并发送，失败则逐条单独发送，避免一条消息导致整组失败"""
+        if len(messages) == 1:
+            return await self._send_now(messages[0], parse_mode)
+        
+        if await self._send_now("\n\n".join(messages), parse_mode, plain_fallback=False):
+            return True
+        
+        logger.warning(f"合并消息发送失败，改为逐条发送 {len(messages)} 条消息")
+        results = [await self._send_now(message, parse_mode) for message in messages]
+        return all(results)
+    
+    async def _send_now(self, message: str, parse_mode: str = "Markdown",
+                        plain_fallback: bool = True) -> bool:
+        """调用Telegram接口发送消息
+
+        Args:
+            plain_fallback: 带格式发送失败时是否退回纯文本重发
+        """
         try:
             # 转义Markdown特殊字符
             # message = self._escape_markdown(message)
@@ -51,6 +166,8 @@ class TelegramService:
             return True
         except Exception as e:
             logger.error(f"发送 Telegram 消息失败: {e}")
+            if not plain_fallback:
+                return False
             # 尝试不使用parse_mode
             try:
                 await self._bot.send_message(
@@ -64,48 +181,34 @@ class TelegramService:
     
     def _escape_markdown(self, text: str) -> str:
         """转义Markdown特殊字符"""
-        escape_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-        for char in escape_chars:
-            text = text.replace(char, f'\\{char}')
-        return text
+        return text.translate(self._ESCAPE_TABLE)
 
 
 # 全局实例
 telegram_service = TelegramService()
 
 
-async def on_new_symbol_detected(symbol: str, change_percent: float):
-    """当检测到新的符合条件的交易对时的处理函数"""
-    from app.database import DatabaseManager
-    from app.models import TradingPair
-    from sqlalchemy import select
+async def prepare_new_symbol(symbol: str, change_percent: float) -> Optional[Dict]:
+    """为新检测到的交易对计算波动率和杠杆，生成待插入的数据行
+
+    Returns:
+        {"row": TradingPair列值, "leverage_data": 杠杆计算结果, "change_percent": 24H变化}，
+        失败时返回None
+    """
     from app.services.leverage_manager import leverage_manager
     from app.services.binance_api import binance_api
-    from app.utils.indicators import technical_indicators
+    from app.utils.indicators import Klines, technical_indicators
     from datetime import datetime
 
-    logger.info(f"[{symbol}] 回调函数被调用，变化: {change_percent}%")
-
-    session = await DatabaseManager.get_session()
     try:
-        # 检查是否已存在
-        result = await session.execute(
-            select(TradingPair).where(TradingPair.symbol == symbol)
-        )
-        existing = result.scalar_one_or_none()
-
-        if existing:
-            logger.info(f"[{symbol}] 交易对已存在（is_active={existing.is_active}），跳过添加")
-            return
-
-        logger.info(f"[{symbol}] 交易对不存在，准备添加...")
-
         # 获取K线数据用于计算波动率和杠杆
         klines = []
         volatility = None
         try:
-            klines = await binance_api.get_klines(symbol, interval="1m", limit=250)
-            if klines and len(klines) >= 200:
+            raw_klines = await binance_api.get_klines(symbol, interval="1m", limit=250)
+            # 只转换一次，波动率与杠杆管理器中的ADX共用同一份数组
+            klines = Klines.from_raw(raw_klines) if raw_klines else []
+            if len(klines) >= 200:
                 # 计算ATR年化波动率
                 volatility = technical_indicators.calculate_atr_volatility(klines, period=14)
                 logger.info(f"[{symbol}] ATR年化波动率: {volatility}%")
@@ -120,61 +223,133 @@ async def on_new_symbol_detected(symbol: str, change_percent: float):
         )
 
         final_leverage = leverage_data["leverage"]
-        market_cap_usd = leverage_data["market_cap_usd"]
-        market_cap_tier = leverage_data["market_cap_tier"]
-        tier_name = leverage_data["tier_name"]
         base_leverage = leverage_data["base_leverage"]
 
         logger.info(
-            f"[{symbol}] 杠杆计算完成: 市值={tier_name}(${market_cap_usd:,.0f}), "
+            f"[{symbol}] 杠杆计算完成: 市值={leverage_data['tier_name']}(${leverage_data['market_cap_usd']:,.0f}), "
             f"基础杠杆={base_leverage}x, 最终杠杆={final_leverage}x, "
             f"波动率={volatility}%, 调整原因: {leverage_data['adjustment_reason']}"
         )
 
-        # 添加新交易对（默认使用高级策略）
-        new_pair = TradingPair(
-            symbol=symbol,
-            leverage=final_leverage,
-            strategy_interval=settings.DEFAULT_STRATEGY_INTERVAL,
-            strategy_type="EMA_ADVANCED",  # 默认使用高级策略（EMA9/72/200）
-            stop_loss_percent=settings.DEFAULT_STOP_LOSS_PERCENT,
-            is_active=True,
-            market_cap_usd=market_cap_usd,
-            market_cap_tier=market_cap_tier,
-            base_leverage=base_leverage,
-            current_leverage=final_leverage,
-            atr_volatility=volatility,
-            last_volatility_check=datetime.utcnow() if volatility else None
-        )
-        session.add(new_pair)
-        await session.commit()
+        # 新交易对默认使用高级策略
+        row = {
+            "symbol": symbol,
+            "leverage": final_leverage,
+            "strategy_interval": settings.DEFAULT_STRATEGY_INTERVAL,
+            "strategy_type": "EMA_ADVANCED",  # 默认使用高级策略（EMA9/72/200）
+            "stop_loss_percent": settings.DEFAULT_STOP_LOSS_PERCENT,
+            "is_active": True,
+            "market_cap_usd": leverage_data["market_cap_usd"],
+            "market_cap_tier": leverage_data["market_cap_tier"],
+            "base_leverage": base_leverage,
+            "current_leverage": final_leverage,
+            "atr_volatility": volatility,
+            "last_volatility_check": datetime.utcnow() if volatility else None,
+        }
+        return {"row": row, "leverage_data": leverage_data, "change_percent": change_percent}
 
-        logger.info(f"[{symbol}] 已成功添加新交易对到数据库")
+    except Exception as e:
+        logger.error(f"[{symbol}] 准备新交易对数据失败: {e}", exc_info=True)
+        return None
 
-        # 通知配置变更
-        await config_manager.notify_observers("trading_pair_added", {
-            "symbol": symbol,
-            "interval": settings.DEFAULT_STRATEGY_INTERVAL
-        })
-        logger.info(f"[{symbol}] 已通知观察者配置变更")
-
-        # TG通知
-        direction = "📈 涨幅" if change_percent > 0 else "📉 跌幅"
-        msg = (
-            f"🆕 **自动添加交易对**\n"
-            f"交易对: {symbol}\n"
-            f"24H变化: {direction} {abs(change_percent):.2f}%\n"
-            f"市值层级: {tier_name}\n"
-            f"市值: ${market_cap_usd:,.0f}\n"
-            f"杠杆: {final_leverage}x (基础{base_leverage}x)\n"
-            f"波动率: {volatility:.2f}% (ATR年化)\n"
-            f"策略: EMA高级策略\n"
-            f"来源: 币安24H涨跌幅监控"
+
+async def get_existing_symbols(symbols: List[str]) -> Set[str]:
+    """一次查询返回已存在于交易对表中的symbol"""
+    if not symbols:
+        return set()
+
+    session = await DatabaseManager.get_session()
+    try:
+        result = await session.execute(
+            select(TradingPair.symbol).where(TradingPair.symbol.in_(symbols))
         )
-        await telegram_service.send_message(msg)
+        return set(result.scalars().all())
+    finally:
+        await session.close()
 
-    except Exception as e:
-        logger.error(f"[{symbol}] 添加新交易对失败: {e}", exc_info=True)
+
+async def add_trading_pairs_bulk(rows: List[Dict]) -> List[str]:
+    """批量添加交易对（单条 INSERT ... ON CONFLICT DO NOTHING，一个事务）
+
+    Returns:
+        实际插入的symbol列表（已存在的交易对会被跳过）
+    """
+    if not rows:
+        return []
+
+    session = await DatabaseManager.get_session()
+    try:
+        stmt = (
+            upsert_insert(TradingPair)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["symbol"])
+            .returning(TradingPair.symbol)
+        )
+        result = await session.execute(stmt)
+        inserted = list(result.scalars().all())
+        await session.commit()
+        return inserted
+    except Exception:
         await session.rollback()
+        raise
     finally:
         await session.close()
+
+
+async def notify_new_symbol_added(prepared: Dict):
+    """新交易对入库后通知观察者并推送TG消息"""
+    row = prepared["row"]
+    leverage_data = prepared["leverage_data"]
+    change_percent = prepared["change_percent"]
+    symbol = row["symbol"]
+
+    # 通知配置变更
+    await config_manager.notify_observers("trading_pair_added", {
+        "symbol": symbol,
+        "interval": row["strategy_interval"]
+    })
+    logger.info(f"[{symbol}] 已通知观察者配置变更")
+
+    # TG通知
+    direction = "📈 涨幅" if change_percent > 0 else "📉 跌幅"
+    volatility = row["atr_volatility"]
+    volatility_text = f"{volatility:.2f}% (ATR年化)" if volatility is not None else "未知"
+    msg = (
+        f"🆕 **自动添加交易对**\n"
+        f"交易对: {symbol}\n"
+        f"24H变化: {direction} {abs(change_percent):.2f}%\n"
+        f"市值层级: {leverage_data['tier_name']}\n"
+        f"市值: ${leverage_data['market_cap_usd']:,.0f}\n"
+        f"杠杆: {row['leverage']}x (基础{row['base_leverage']}x)\n"
+        f"波动率: {volatility_text}\n"
+        f"策略: EMA高级策略\n"
+        f"来源: 币安24H涨跌幅监控"
+    )
+    await telegram_service.send_message(msg)
+
+
+async def on_new_symbol_detected(symbol: str, change_percent: float):
+    """当检测到新的符合条件的交易对时的处理函数（单个交易对）
+
+    批量场景请使用 prepare_new_symbol + add_trading_pairs_bulk
+    """
+    logger.info(f"[{symbol}] 回调函数被调用，变化: {change_percent}%")
+
+    try:
+        if await get_existing_symbols([symbol]):
+            logger.info(f"[{symbol}] 交易对已存在，跳过添加")
+            return
+
+        prepared = await prepare_new_symbol(symbol, change_percent)
+        if not prepared:
+            return
+
+        if not await add_trading_pairs_bulk([prepared["row"]]):
+            logger.info(f"[{symbol}] 交易对已存在，跳过添加")
+            return
+
+        logger.info(f"[{symbol}] 已成功添加新交易对到数据库")
+        await notify_new_symbol_added(prepared)
+
+    except Exception as e:
+        logger.error(f"[{symbol}] 添加新交易对失败: {e}", exc_info=True)
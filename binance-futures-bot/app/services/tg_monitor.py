@@ -4,8 +4,7 @@
 """
 import asyncio
 import logging
-from datetime import datetime
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +21,10 @@ class PriceChangeMonitor:
         self._task = None
         self._checked_symbols: Set[str] = set()  # 已处理过的symbol，避免重复通知
         self._check_interval = 300  # 默认5分钟检查一次
+        self._max_concurrency = 8  # 同时处理的币种数量上限
+        # 在 start() 中解析一次；settings 为原地修改的单例，阈值变更无需重新获取
+        self._settings = None
+        self._binance_api = None
     
     def _get_settings(self):
         """延迟导入配置，避免循环导入"""
@@ -33,39 +36,103 @@ class PriceChangeMonitor:
         from app.services.binance_api import binance_api
         return binance_api
     
+    async def _load_checked_symbols(self):
+        """从数据库预加载已存在的交易对到已检查集合
+        
+        交易对表本身就是持久化的"已处理"记录，重启后无需再为
+        已添加的币种重复查询数据库
+        """
+        from app.database import DatabaseManager
+        from app.models import TradingPair
+        from sqlalchemy import select
+        
+        session = await DatabaseManager.get_session()
+        try:
+            result = await session.execute(select(TradingPair.symbol))
+            symbols = result.scalars().all()
+            self._checked_symbols.update(symbols)
+            logger.info(f"已预加载 {len(symbols)} 个已存在的交易对到涨跌幅监控缓存")
+        except Exception as e:
+            logger.warning(f"预加载已存在交易对失败: {e}")
+        finally:
+            await session.close()
+    
     async def _process_high_change_symbols(self, symbols: List[Dict]):
-        """处理涨跌幅超阈值的币种"""
-        from app.services.telegram import on_new_symbol_detected
+        """处理涨跌幅超阈值的币种
+
+        1. 一次查询过滤掉已存在的交易对
+        2. 并发计算波动率/杠杆（信号量限制并发数）
+        3. 单条批量INSERT写入，再逐个通知
+        """
+        from app.services.telegram import (
+            add_trading_pairs_bulk, get_existing_symbols, notify_new_symbol_added
+        )
         
-        settings = self._get_settings()
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # 检查是否已处理过（本次运行周期内）
+        candidates = [s for s in symbols if s["symbol"] not in self._checked_symbols]
+        if not candidates:
+            return
         
-        for symbol_data in symbols:
-            symbol = symbol_data["symbol"]
-            change_percent = symbol_data["priceChangePercent"]
-            
-            # 检查是否已处理过（本次运行周期内）
-            if symbol in self._checked_symbols:
+        try:
+            existing = await get_existing_symbols([s["symbol"] for s in candidates])
+        except Exception as e:
+            logger.error(f"查询已存在交易对失败: {e}")
+            return
+        
+        if existing:
+            logger.info(f"{len(existing)} 个交易对已存在，跳过添加: {', '.join(sorted(existing))}")
+            self._checked_symbols.update(existing)
+            candidates = [s for s in candidates if s["symbol"] not in existing]
+        
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        results = await asyncio.gather(
+            *(self._prepare_one(symbol_data, semaphore) for symbol_data in candidates),
+            return_exceptions=True
+        )
+        prepared = [r for r in results if isinstance(r, dict)]
+        if not prepared:
+            return
+        
+        try:
+            inserted = set(await add_trading_pairs_bulk([p["row"] for p in prepared]))
+        except Exception as e:
+            logger.error(f"批量添加交易对失败: {e}", exc_info=True)
+            return
+        
+        logger.info(f"已批量添加 {len(inserted)} 个新交易对到数据库")
+        for p in prepared:
+            symbol = p["row"]["symbol"]
+            self._checked_symbols.add(symbol)
+            if symbol not in inserted:
                 continue
-            
-            direction = "涨幅" if change_percent > 0 else "跌幅"
-            logger.info(f"[{now}] [{symbol}] 检测到{direction} {abs(change_percent):.2f}% >= 阈值 {settings.MIN_PRICE_CHANGE_PERCENT}%")
-            
             try:
-                # 调用回调函数添加交易对
-                await on_new_symbol_detected(symbol, change_percent)
-                self._checked_symbols.add(symbol)
+                await notify_new_symbol_added(p)
             except Exception as e:
-                logger.error(f"[{symbol}] 添加交易对失败: {e}")
+                logger.error(f"[{symbol}] 新交易对通知失败: {e}")
+    
+    async def _prepare_one(self, symbol_data: Dict, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+        """为单个涨跌幅超阈值的币种计算待插入数据"""
+        from app.services.telegram import prepare_new_symbol
+        
+        settings = self._settings
+        symbol = symbol_data["symbol"]
+        change_percent = symbol_data["priceChangePercent"]
+        
+        async with semaphore:
+            direction = "涨幅" if change_percent > 0 else "跌幅"
+            logger.info(f"[{symbol}] 检测到{direction} {abs(change_percent):.2f}% >= 阈值 {settings.MIN_PRICE_CHANGE_PERCENT}%")
+            return await prepare_new_symbol(symbol, change_percent)
     
     async def _check_loop(self):
         """定时检查循环"""
-        settings = self._get_settings()
-        binance_api = self._get_binance_api()
+        settings = self._settings
         
         logger.info(f"【涨跌幅监控】已启动，检查间隔: {self._check_interval}秒")
         logger.info(f"规则: 24小时涨跌幅绝对值 >= {settings.MIN_PRICE_CHANGE_PERCENT}% 自动添加交易对")
         
+        # 预加载已存在的交易对
+        await self._load_checked_symbols()
+        
         # 首次启动立即检查一次
         await self._do_check()
         
@@ -86,30 +153,33 @@ class PriceChangeMonitor:
     
     async def _do_check(self):
         """执行一次检查"""
-        settings = self._get_settings()
-        binance_api = self._get_binance_api()
+        settings = self._settings
         
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        logger.info(f"[{now}] 正在检查24小时涨跌幅...")
+        logger.info("正在检查24小时涨跌幅...")
         
         try:
             # 获取涨跌幅超阈值的币种
-            high_change_symbols = await binance_api.get_high_change_symbols(
+            high_change_symbols = await self._binance_api.get_high_change_symbols(
                 min_change_percent=settings.MIN_PRICE_CHANGE_PERCENT
             )
             
             if high_change_symbols:
-                # 分离涨幅和跌幅
-                gainers = [s for s in high_change_symbols if s["priceChangePercent"] > 0]
-                losers = [s for s in high_change_symbols if s["priceChangePercent"] < 0]
+                # 单次遍历统计涨幅和跌幅数量
+                gainers = losers = 0
+                for s in high_change_symbols:
+                    change = s["priceChangePercent"]
+                    if change > 0:
+                        gainers += 1
+                    elif change < 0:
+                        losers += 1
                 
-                logger.info(f"[{now}] 发现 {len(gainers)} 个涨幅 >= {settings.MIN_PRICE_CHANGE_PERCENT}%，"
-                           f"{len(losers)} 个跌幅 >= {settings.MIN_PRICE_CHANGE_PERCENT}%")
+                logger.info(f"发现 {gainers} 个涨幅 >= {settings.MIN_PRICE_CHANGE_PERCENT}%，"
+                           f"{losers} 个跌幅 >= {settings.MIN_PRICE_CHANGE_PERCENT}%")
                 
                 # 处理这些币种
                 await self._process_high_change_symbols(high_change_symbols)
             else:
-                logger.info(f"[{now}] 当前没有涨跌幅绝对值 >= {settings.MIN_PRICE_CHANGE_PERCENT}% 的币种")
+                logger.info(f"当前没有涨跌幅绝对值 >= {settings.MIN_PRICE_CHANGE_PERCENT}% 的币种")
                 
         except Exception as e:
             logger.error(f"获取24小时涨跌幅失败: {e}")
@@ -133,6 +203,8 @@ class PriceChangeMonitor:
         
         self._check_interval = check_interval
         self._running = True
+        self._settings = self._get_settings()
+        self._binance_api = self._get_binance_api()
         self._task = asyncio.create_task(self._check_loop())
         logger.info("涨跌幅监控任务已启动")
     
@@ -158,6 +230,9 @@ class PriceChangeMonitor:
     
     async def check_now(self):
         """立即执行一次检查（手动触发）"""
+        if self._settings is None:
+            self._settings = self._get_settings()
+            self._binance_api = self._get_binance_api()
         await self._do_check()
 
 
@@ -5,10 +5,10 @@
 import asyncio
 import json
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
-from sqlalchemy import select
+from sqlalchemy import select, insert
 
 from app.config import settings, config_manager
 from app.database import DatabaseManager
@@ -41,6 +41,7 @@ class TrailingStopManager:
         self._check_task: Optional[asyncio.Task] = None
         self._check_interval = 5  # 检查间隔(秒)
         self._config: Dict = DEFAULT_TRAILING_CONFIG.copy()  # 当前配置
+        self._pending_logs: List[Dict] = []  # 本轮检查待写入的止损调整日志
     
     async def load_config(self):
         """从数据库加载止损配置"""
@@ -93,13 +94,17 @@ class TrailingStopManager:
             position: 仓位对象
             current_price: 当前价格
         """
+        # 一次性读取ORM属性到局部变量，避免热路径上重复的属性访问
         symbol = position.symbol
+        side = position.side
+        entry_price = position.entry_price
+        stop_loss_price = position.stop_loss_price
         profit_percent = self.calculate_profit_percent(position, current_price)
 
         logger.debug(f"[{symbol}] 当前盈亏: {profit_percent:.2f}%, 现价: {current_price}, 部分平仓状态: {position.is_partial_closed}")
         
         # 更新最高/最低价格
-        if position.side == "LONG":
+        if side == "LONG":
             if symbol not in self._highest_prices or current_price > self._highest_prices[symbol]:
                 self._highest_prices[symbol] = current_price
             highest = self._highest_prices[symbol]
@@ -137,15 +142,15 @@ class TrailingStopManager:
         # 级别1: 保本止损
         if l1_min <= profit_percent < (l1_max or float('inf')) and current_level < 1:
             if l1_lock == 0:
-                new_stop_price = position.entry_price
+                new_stop_price = entry_price
                 locked_profit = 0.0
                 adjust_reason = "盈利保护 - 止损提至成本价"
-                adjust_detail = f"当前价格变动{profit_percent:.2f}%（触发阈值{l1_min}%），止损从{position.stop_loss_price:.6f}提升至成本价{position.entry_price:.6f}，确保不亏损"
+                adjust_detail = f"当前价格变动{profit_percent:.2f}%（触发阈值{l1_min}%），止损从{stop_loss_price:.6f}提升至成本价{entry_price:.6f}，确保不亏损"
             else:
-                if position.side == "LONG":
-                    new_stop_price = position.entry_price * (1 + l1_lock / 100)
+                if side == "LONG":
+                    new_stop_price = entry_price * (1 + l1_lock / 100)
                 else:
-                    new_stop_price = position.entry_price * (1 - l1_lock / 100)
+                    new_stop_price = entry_price * (1 - l1_lock / 100)
                 locked_profit = l1_lock
                 adjust_reason = f"盈利保护 - 锁定{l1_lock}%利润"
                 adjust_detail = f"当前价格变动{profit_percent:.2f}%（触发阈值{l1_min}%），锁定{l1_lock}%利润，止损价设为{new_stop_price:.6f}"
@@ -154,10 +159,10 @@ class TrailingStopManager:
         
         # 级别2: 锁定利润
         elif l2_min <= profit_percent < (l2_max or float('inf')) and current_level < 2:
-            if position.side == "LONG":
-                new_stop_price = position.entry_price * (1 + l2_lock / 100)
+            if side == "LONG":
+                new_stop_price = entry_price * (1 + l2_lock / 100)
             else:
-                new_stop_price = position.entry_price * (1 - l2_lock / 100)
+                new_stop_price = entry_price * (1 - l2_lock / 100)
             new_level = 2
             locked_profit = l2_lock
             adjust_reason = f"锁定利润 - 保护{l2_lock}%价格收益"
@@ -180,10 +185,10 @@ class TrailingStopManager:
                     # 即使部分平仓失败，仍然继续设置止损
 
             # 设置剩余仓位的止损（基于剩余数量）
-            if position.side == "LONG":
-                new_stop_price = position.entry_price * (1 + l3_lock / 100)
+            if side == "LONG":
+                new_stop_price = entry_price * (1 + l3_lock / 100)
             else:
-                new_stop_price = position.entry_price * (1 - l3_lock / 100)
+                new_stop_price = entry_price * (1 - l3_lock / 100)
             new_level = 3
             is_trailing = l3_trailing
             locked_profit = l3_lock
@@ -196,35 +201,35 @@ class TrailingStopManager:
         if is_trailing and current_level >= 3:
             trailing_percent = l3_trailing_pct
             
-            if position.side == "LONG":
+            if side == "LONG":
                 # 做多：从最高价回撤trailing_percent
                 trailing_stop = highest * (1 - trailing_percent / 100)
                 # 只有新止损更高才更新
-                if trailing_stop > position.stop_loss_price:
+                if trailing_stop > stop_loss_price:
                     new_stop_price = trailing_stop
                     # 计算锁定的价格利润百分比
-                    locked_profit = ((trailing_stop - position.entry_price) / position.entry_price) * 100
+                    locked_profit = ((trailing_stop - entry_price) / entry_price) * 100
                     adjust_reason = "追踪止损上移"
                     adjust_detail = f"价格创新高{highest:.6f}，止损跟随上移至{new_stop_price:.6f}（回撤{trailing_percent:.2f}%），当前锁定价格利润约{locked_profit:.2f}%"
-                    logger.info(f"[{symbol}] 追踪止损更新: 最高价={highest}, 原止损={position.stop_loss_price} -> 新止损={new_stop_price}")
+                    logger.info(f"[{symbol}] 追踪止损更新: 最高价={highest}, 原止损={stop_loss_price} -> 新止损={new_stop_price}")
             else:
                 # 做空：从最低价反弹trailing_percent
                 trailing_stop = highest * (1 + trailing_percent / 100)
                 # 只有新止损更低才更新
-                if trailing_stop < position.stop_loss_price:
+                if trailing_stop < stop_loss_price:
                     new_stop_price = trailing_stop
                     # 计算锁定的价格利润百分比
-                    locked_profit = ((position.entry_price - trailing_stop) / position.entry_price) * 100
+                    locked_profit = ((entry_price - trailing_stop) / entry_price) * 100
                     adjust_reason = "追踪止损下移"
                     adjust_detail = f"价格创新低{highest:.6f}，止损跟随下移至{new_stop_price:.6f}（反弹{trailing_percent:.2f}%），当前锁定价格利润约{locked_profit:.2f}%"
-                    logger.info(f"[{symbol}] 追踪止损更新: 最低价={highest}, 原止损={position.stop_loss_price} -> 新止损={new_stop_price}")
+                    logger.info(f"[{symbol}] 追踪止损更新: 最低价={highest}, 原止损={stop_loss_price} -> 新止损={new_stop_price}")
         
         # 更新止损并记录日志
-        if new_stop_price and new_stop_price != position.stop_loss_price and adjust_reason:
+        if new_stop_price and new_stop_price != stop_loss_price and adjust_reason:
             # 先记录止损调整日志
             await self._log_stop_loss_adjustment(
                 position=position,
-                old_stop_price=position.stop_loss_price,
+                old_stop_price=stop_loss_price,
                 new_stop_price=new_stop_price,
                 current_price=current_price,
                 profit_percent=profit_percent,
@@ -277,29 +282,39 @@ class TrailingStopManager:
         adjust_reason: str,
         adjust_detail: str
     ):
-        """记录止损调整日志到数据库"""
+        """记录止损调整日志（暂存，每轮检查结束后批量写入数据库）"""
+        self._pending_logs.append({
+            "symbol": position.symbol,
+            "side": position.side,
+            "entry_price": position.entry_price,
+            "old_stop_price": old_stop_price,
+            "new_stop_price": new_stop_price,
+            "current_price": current_price,
+            "profit_percent": profit_percent,
+            "locked_profit_percent": locked_profit_percent,
+            "old_level": old_level,
+            "new_level": new_level,
+            "is_trailing": is_trailing,
+            "adjust_reason": adjust_reason,
+            "adjust_detail": adjust_detail,
+            # 记录调整发生的时间，而不是批量写入的时间
+            "created_at": datetime.utcnow()
+        })
+        logger.debug(f"[{position.symbol}] 止损调整日志已暂存: {adjust_reason}")
+    
+    async def _flush_stop_loss_logs(self):
+        """批量写入暂存的止损调整日志（单个会话，一次executemany）"""
+        if not self._pending_logs:
+            return
+        
+        logs, self._pending_logs = self._pending_logs, []
         session = await DatabaseManager.get_session()
         try:
-            log = StopLossLog(
-                symbol=position.symbol,
-                side=position.side,
-                entry_price=position.entry_price,
-                old_stop_price=old_stop_price,
-                new_stop_price=new_stop_price,
-                current_price=current_price,
-                profit_percent=profit_percent,
-                locked_profit_percent=locked_profit_percent,
-                old_level=old_level,
-                new_level=new_level,
-                is_trailing=is_trailing,
-                adjust_reason=adjust_reason,
-                adjust_detail=adjust_detail
-            )
-            session.add(log)
+            await session.execute(insert(StopLossLog), logs)
             await session.commit()
-            logger.debug(f"[{position.symbol}] 止损调整日志已记录: {adjust_reason}")
+            logger.debug(f"已批量记录 {len(logs)} 条止损调整日志")
         except Exception as e:
-            logger.error(f"[{position.symbol}] 记录止损调整日志失败: {e}")
+            logger.error(f"批量记录止损调整日志失败: {e}")
             await session.rollback()
         finally:
             await session.close()
@@ -311,18 +326,17 @@ class TrailingStopManager:
                 # 先同步交易所实际持仓状态，清理已平仓的仓位
                 await self._sync_positions_with_exchange()
                 
-                positions = position_manager.get_all_positions()
+                positions = position_manager.get_open_positions()
                 
                 for position in positions:
-                    if position.status != "OPEN":
-                        continue
-                    
                     try:
                         current_price = await binance_api.get_current_price(position.symbol)
                         await self.check_trailing_stop(position, current_price)
                     except Exception as e:
                         logger.error(f"[{position.symbol}] 检查移动止损失败: {e}")
                 
+                await self._flush_stop_loss_logs()
+                
                 await asyncio.sleep(self._check_interval)
                 
             except Exception as e:
@@ -337,7 +351,7 @@ class TrailingStopManager:
             exchange_symbols = {p["symbol"] for p in exchange_positions}
             
             # 获取本地缓存的仓位
-            local_positions = position_manager.get_all_positions()
+            local_positions = position_manager.get_open_positions()
             
             for position in local_positions:
                 if position.symbol not in exchange_symbols:
@@ -377,6 +391,7 @@ class TrailingStopManager:
                 await self._check_task
             except asyncio.CancelledError:
                 pass
+        await self._flush_stop_loss_logs()
         logger.info("移动止损管理器已停止")
     
     def reset_tracking(self, symbol: str):
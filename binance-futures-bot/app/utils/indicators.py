@@ -4,21 +4,192 @@
 """
 import logging
 import numpy as np
-from typing import List, Tuple, Optional
+from dataclasses import dataclass
+from typing import List, Tuple, Optional, Union
 import math
 
+from app.utils.jit import njit
+
 logger = logging.getLogger(__name__)
 
 
+@njit(cache=True, fastmath=True)
+def _ema_smooth(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder平滑内核（numba编译，乘数为1/period）
+
+    以前period个值的均值作为首个平滑值，之前的位置保持为0。
+    """
+    out = np.zeros(values.size)
+    first = period - 1
+    out[first] = values[:period].mean()
+
+    multiplier = 1.0 / period
+    for i in range(first + 1, values.size):
+        out[i] = out[i - 1] + multiplier * (values[i] - out[i - 1])
+
+    return out
+
+
+@njit(cache=True, fastmath=True)
+def _adx_core(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+              period: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ADX融合内核（numba编译）
+
+    单次遍历完成 +DM/-DM、TR 的Wilder平滑、DI、DX 及 ADX 平滑，
+    只分配三个输出数组。输出长度为 len(high) - 1，未就绪的位置为0。
+    """
+    n = high.size - 1
+    adx = np.zeros(n)
+    plus_di = np.zeros(n)
+    minus_di = np.zeros(n)
+
+    tr_sum = 0.0
+    pdm_sum = 0.0
+    ndm_sum = 0.0
+    dx_sum = 0.0
+    adx_val = 0.0
+
+    for j in range(n):
+        i = j + 1
+
+        # +DM / -DM
+        high_diff = high[i] - high[i - 1]
+        low_diff = low[i - 1] - low[i]
+        pdm = high_diff if (high_diff > low_diff and high_diff > 0) else 0.0
+        ndm = low_diff if (low_diff > high_diff and low_diff > 0) else 0.0
+
+        # True Range
+        tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+
+        # Wilder平滑（前period个值求和作为初始值）
+        if j < period:
+            tr_sum += tr
+            pdm_sum += pdm
+            ndm_sum += ndm
+            if j < period - 1:
+                continue
+        else:
+            tr_sum = tr_sum - tr_sum / period + tr
+            pdm_sum = pdm_sum - pdm_sum / period + pdm
+            ndm_sum = ndm_sum - ndm_sum / period + ndm
+
+        # +DI / -DI（ATR = 平滑TR / period，与原实现一致）
+        atr = tr_sum / period
+        pdi = 0.0
+        ndi = 0.0
+        if atr != 0:
+            pdi = pdm_sum / atr * 100
+            ndi = ndm_sum / atr * 100
+        plus_di[j] = pdi
+        minus_di[j] = ndi
+
+        # DX
+        di_sum = pdi + ndi
+        dx = abs(pdi - ndi) / di_sum * 100 if di_sum != 0 else 0.0
+
+        # ADX（DX的平滑移动平均，前period个DX的均值作为初始值）
+        if j < 2 * period - 2:
+            dx_sum += dx
+        elif j == 2 * period - 2:
+            dx_sum += dx
+            adx_val = dx_sum / period
+            adx[j] = adx_val
+        else:
+            adx_val = adx_val + (dx - adx_val) / period
+            adx[j] = adx_val
+
+    return adx, plus_di, minus_di
+
+
+@dataclass
+class Klines:
+    """K线的列式存储（SoA），每个字段为连续的NumPy数组
+
+    原始K线为 [open_time, open, high, low, close, volume, ...] 的列表，
+    在入口处转换一次后，各指标直接按字段取连续数组，不再逐行 float()。
+    """
+    open_time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return self.close.size
+
+    def __getitem__(self, item: slice) -> "Klines":
+        """按切片取子区间，各字段均为原数组的视图（不复制数据）"""
+        return Klines(
+            open_time=self.open_time[item],
+            open=self.open[item],
+            high=self.high[item],
+            low=self.low[item],
+            close=self.close[item],
+            volume=self.volume[item],
+        )
+
+    @classmethod
+    def from_raw(cls, klines: Union[List[list], "Klines"]) -> "Klines":
+        """将原始K线列表转换为Klines（已是Klines时原样返回）
+
+        缓存中的K线长度可能不一，先切片前6列再转换
+        """
+        if isinstance(klines, cls):
+            return klines
+
+        # 转置后复制，使每一列都是连续内存
+        cols = np.array([k[:6] for k in klines], dtype=np.float64).reshape(-1, 6).T.copy()
+        return cls(
+            open_time=cols[0].astype(np.int64),
+            open=cols[1],
+            high=cols[2],
+            low=cols[3],
+            close=cols[4],
+            volume=cols[5],
+        )
+
+
+KlinesLike = Union[List[list], Klines]
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """计算原始True Range数组（向量化，长度为 len(high) - 1）"""
+    high_low = high[1:] - low[1:]
+    high_close = np.abs(high[1:] - close[:-1])
+    low_close = np.abs(low[1:] - close[:-1])
+    return np.maximum(high_low, np.maximum(high_close, low_close))
+
+
 class TechnicalIndicators:
     """技术指标计算器"""
 
+    # 各K线周期的年化因子: sqrt(一年内的K线根数)，类加载时计算一次
+    _ANNUAL_FACTOR_1M: float = math.sqrt(365 * 24 * 60)  # sqrt(525600) ≈ 725.07
+    _ANNUAL_FACTOR_5M: float = math.sqrt(365 * 24 * 12)
+    _ANNUAL_FACTOR_15M: float = math.sqrt(365 * 24 * 4)
+    _ANNUAL_FACTOR_1H: float = math.sqrt(365 * 24)
+    _ANNUAL_FACTORS = {
+        "1m": _ANNUAL_FACTOR_1M,
+        "5m": _ANNUAL_FACTOR_5M,
+        "15m": _ANNUAL_FACTOR_15M,
+        "1h": _ANNUAL_FACTOR_1H,
+    }
+
+    @staticmethod
+    def _atr_from_klines(bars: Klines, period: int) -> np.ndarray:
+        """基于已转换的Klines计算ATR"""
+        tr_array = _true_range(bars.high, bars.low, bars.close)
+
+        # 计算ATR（使用EMA平滑）
+        return _ema_smooth(tr_array, period)
+
     @staticmethod
-    def calculate_atr(klines: List[dict], period: int = 14) -> List[float]:
+    def calculate_atr(klines: KlinesLike, period: int = 14) -> List[float]:
         """计算ATR (Average True Range)
 
         Args:
-            klines: K线数据 [open_time, open, high, low, close, volume, ...]
+            klines: K线数据 [open_time, open, high, low, close, volume, ...] 或 Klines
             period: ATR周期
 
         Returns:
@@ -27,65 +198,49 @@ class TechnicalIndicators:
         if len(klines) < period + 1:
             return []
 
-        high_prices = np.array([float(k[2]) for k in klines])
-        low_prices = np.array([float(k[3]) for k in klines])
-        close_prices = np.array([float(k[4]) for k in klines])
-
-        # 计算True Range
-        tr_list = []
-        for i in range(1, len(klines)):
-            high_low = high_prices[i] - low_prices[i]
-            high_close = abs(high_prices[i] - close_prices[i - 1])
-            low_close = abs(low_prices[i] - close_prices[i - 1])
-            tr = max(high_low, high_close, low_close)
-            tr_list.append(tr)
-
-        tr_array = np.array(tr_list)
-
-        # 计算ATR（使用EMA平滑）
-        atr = np.zeros(len(tr_array))
-        atr[period - 1] = np.mean(tr_array[:period])
-
-        multiplier = 1 / period
-        for i in range(period, len(tr_array)):
-            atr[i] = atr[i - 1] * (1 - multiplier) + tr_array[i] * multiplier
-
-        return atr.tolist()
+        bars = Klines.from_raw(klines)
+        return TechnicalIndicators._atr_from_klines(bars, period).tolist()
 
     @staticmethod
-    def calculate_atr_volatility(klines: List[dict], period: int = 14) -> Optional[float]:
-        """计算ATR年化波动率（针对1分钟K线）
+    def calculate_atr_volatility(klines: KlinesLike, period: int = 14,
+                                 interval: str = "1m") -> Optional[float]:
+        """计算ATR年化波动率（默认针对1分钟K线）
 
         Args:
             klines: K线数据
             period: ATR周期
+            interval: K线周期，支持 1m/5m/15m/1h
 
         Returns:
             年化波动率百分比，如 150.5 表示 150.5%
         """
+        annualization_factor = TechnicalIndicators._ANNUAL_FACTORS.get(interval)
+        if annualization_factor is None:
+            logger.warning(f"不支持的K线周期: {interval}，无法计算年化波动率")
+            return None
+
         if len(klines) < period + 1:
             return None
 
-        atr_values = TechnicalIndicators.calculate_atr(klines, period)
-        if not atr_values:
+        # K线只转换一次，ATR与当前价格共用同一份Klines
+        bars = Klines.from_raw(klines)
+        atr_values = TechnicalIndicators._atr_from_klines(bars, period)
+        if atr_values.size == 0:
             return None
 
-        current_atr = atr_values[-1]
-        current_price = float(klines[-1][4])
+        current_atr = float(atr_values[-1])
+        current_price = float(bars.close[-1])
 
         if current_price == 0:
             return None
 
-        # 1分钟K线的年化因子: sqrt(365 * 24 * 60) = sqrt(525600) ≈ 725.07
-        annualization_factor = math.sqrt(365 * 24 * 60)
-
         # ATR年化波动率 = (ATR / Price) * 年化因子 * 100%
         volatility_percent = (current_atr / current_price) * annualization_factor * 100
 
         return round(volatility_percent, 2)
 
     @staticmethod
-    def calculate_adx(klines: List[dict], period: int = 14) -> Tuple[List[float], List[float], List[float]]:
+    def calculate_adx(klines: KlinesLike, period: int = 14) -> Tuple[List[float], List[float], List[float]]:
         """计算ADX (Average Directional Index)
 
         Args:
@@ -98,72 +253,13 @@ class TechnicalIndicators:
         if len(klines) < period * 2:
             return [], [], []
 
-        high_prices = np.array([float(k[2]) for k in klines])
-        low_prices = np.array([float(k[3]) for k in klines])
-        close_prices = np.array([float(k[4]) for k in klines])
-
-        # 计算+DM和-DM
-        plus_dm = []
-        minus_dm = []
-        for i in range(1, len(klines)):
-            high_diff = high_prices[i] - high_prices[i - 1]
-            low_diff = low_prices[i - 1] - low_prices[i]
-
-            if high_diff > low_diff and high_diff > 0:
-                plus_dm.append(high_diff)
-            else:
-                plus_dm.append(0)
-
-            if low_diff > high_diff and low_diff > 0:
-                minus_dm.append(low_diff)
-            else:
-                minus_dm.append(0)
-
-        plus_dm = np.array(plus_dm)
-        minus_dm = np.array(minus_dm)
-
-        # 计算ATR
-        atr_values = TechnicalIndicators.calculate_atr(klines, period)
-        atr_array = np.array(atr_values)
-
-        # 平滑+DM和-DM
-        smoothed_plus_dm = np.zeros(len(plus_dm))
-        smoothed_minus_dm = np.zeros(len(minus_dm))
-
-        smoothed_plus_dm[period - 1] = np.sum(plus_dm[:period])
-        smoothed_minus_dm[period - 1] = np.sum(minus_dm[:period])
-
-        for i in range(period, len(plus_dm)):
-            smoothed_plus_dm[i] = smoothed_plus_dm[i - 1] - (smoothed_plus_dm[i - 1] / period) + plus_dm[i]
-            smoothed_minus_dm[i] = smoothed_minus_dm[i - 1] - (smoothed_minus_dm[i - 1] / period) + minus_dm[i]
-
-        # 计算+DI和-DI
-        plus_di = np.zeros(len(atr_array))
-        minus_di = np.zeros(len(atr_array))
-
-        for i in range(period - 1, len(atr_array)):
-            if atr_array[i] != 0:
-                plus_di[i] = (smoothed_plus_dm[i] / atr_array[i]) * 100
-                minus_di[i] = (smoothed_minus_dm[i] / atr_array[i]) * 100
-
-        # 计算DX
-        dx = np.zeros(len(plus_di))
-        for i in range(period - 1, len(plus_di)):
-            di_sum = plus_di[i] + minus_di[i]
-            if di_sum != 0:
-                dx[i] = abs(plus_di[i] - minus_di[i]) / di_sum * 100
-
-        # 计算ADX（DX的平滑移动平均）
-        adx = np.zeros(len(dx))
-        adx[period * 2 - 2] = np.mean(dx[period - 1:period * 2 - 1])
-
-        for i in range(period * 2 - 1, len(dx)):
-            adx[i] = (adx[i - 1] * (period - 1) + dx[i]) / period
+        bars = Klines.from_raw(klines)
+        adx, plus_di, minus_di = _adx_core(bars.high, bars.low, bars.close, period)
 
         return adx.tolist(), plus_di.tolist(), minus_di.tolist()
 
     @staticmethod
-    def calculate_volume_average(klines: List[dict], period: int = 30) -> List[float]:
+    def calculate_volume_average(klines: KlinesLike, period: int = 30) -> List[float]:
         """计算成交量均线
 
         Args:
@@ -176,17 +272,33 @@ class TechnicalIndicators:
         if len(klines) < period:
             return []
 
-        volumes = np.array([float(k[5]) for k in klines])
-        volume_ma = []
+        volumes = Klines.from_raw(klines).volume
 
-        for i in range(period - 1, len(volumes)):
-            ma = np.mean(volumes[i - period + 1:i + 1])
-            volume_ma.append(ma)
+        # 前缀和滑动窗口: 每个窗口和 = cs[i + period] - cs[i]，O(n)
+        cs = np.concatenate(([0.0], np.cumsum(volumes)))
+        volume_ma = (cs[period:] - cs[:-period]) / period
+
+        return volume_ma.tolist()
+
+    @staticmethod
+    def calculate_last_volume_average(klines: KlinesLike, period: int = 30) -> Optional[float]:
+        """只计算最近一个窗口的成交量均值（O(period)，无需整段均线）
+
+        Args:
+            klines: K线数据
+            period: 均线周期
+
+        Returns:
+            最近period根K线的平均成交量，数据不足时返回None
+        """
+        if len(klines) < period:
+            return None
 
-        return volume_ma
+        volumes = Klines.from_raw(klines).volume
+        return float(volumes[-period:].mean())
 
     @staticmethod
-    def check_volume_surge(klines: List[dict], period: int = 30, multiplier: float = 1.8) -> bool:
+    def check_volume_surge(klines: KlinesLike, period: int = 30, multiplier: float = 1.8) -> bool:
         """检查成交量是否突破均量
 
         Args:
@@ -200,14 +312,14 @@ class TechnicalIndicators:
         if len(klines) < period + 1:
             return False
 
-        volume_ma = TechnicalIndicators.calculate_volume_average(klines, period)
-        if not volume_ma:
+        bars = Klines.from_raw(klines)
+        avg_volume = TechnicalIndicators.calculate_last_volume_average(bars, period)
+        if avg_volume is None:
             return False
 
-        current_volume = float(klines[-1][5])
-        avg_volume = volume_ma[-1]
+        current_volume = float(bars.volume[-1])
 
-        return current_volume >= avg_volume * multiplier
+        return bool(current_volume >= avg_volume * multiplier)
 
 
 # 全局实例
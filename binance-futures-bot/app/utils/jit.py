@@ -0,0 +1,24 @@
+"""
+JIT编译工具
+numba 可用时使用 njit 编译数值计算内核，不可用时退化为普通Python函数
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba为可选依赖
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """numba不可用时的占位装饰器，直接返回原函数"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+    logger.info("未安装numba，数值计算内核将以纯Python方式运行")
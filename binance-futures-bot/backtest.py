@@ -3,17 +3,120 @@
 用于回测EMA高级策略的表现
 """
 import asyncio
+import csv
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import pandas as pd
+from typing import List, Dict, NamedTuple, Optional, Tuple
+import numpy as np
 from app.services.strategy import ema_advanced_strategy, SignalType
 from app.services.binance_api import binance_api
-from app.utils.indicators import technical_indicators
+from app.utils.indicators import Klines, technical_indicators
+from app.utils.jit import njit
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+KLINE_PAGE_LIMIT = 1000  # 币安单次K线请求上限
+KLINE_FETCH_CONCURRENCY = 5  # 并发分页请求数
+KLINE_FETCH_RETRIES = 3  # 单个分页的最大请求次数
+
+class TradeRecord(NamedTuple):
+    """单笔交易记录（元组存储，比逐笔构建字典更省内存）"""
+    symbol: str
+    side: str
+    entry_price: float
+    exit_price: float
+    quantity: float
+    pnl: float
+    pnl_percent: float
+    opened_at: datetime
+    closed_at: datetime
+    reason: str
+    stop_level: int
+    is_partial_closed: bool
+
+
+# 交易明细CSV的列
+TRADE_FIELDS = list(TradeRecord._fields)
+
+
+# _stop_loss_step 返回的动作代码
+_ACTION_NONE = 0
+_ACTION_STOP_LOSS = -1
+_ACTION_LEVEL_1 = 1
+_ACTION_LEVEL_2 = 2
+_ACTION_LEVEL_3 = 3
+
+
+@njit(cache=True)
+def _stop_loss_step(is_long: bool, entry_price: float, stop_loss_price: float,
+                    stop_level: int, is_partial_closed: bool, extreme_price: float,
+                    trailing_percent: float, has_trailing: bool, current_price: float,
+                    level_stops: Tuple[float, float, float]):
+    """单根K线的止损/4级止盈状态转移（numba编译）
+
+    extreme_price 为多单的最高价 / 空单的最低价。
+    level_stops 为开仓时预先算好的 Level 1/2/3 止损价。
+
+    Returns:
+        (动作代码, 盈利百分比, 新止损价, 新止损级别, 新极值价, 追踪止损是否移动)
+    """
+    # 计算当前盈亏百分比（基于价格，不含杠杆）
+    if is_long:
+        profit_percent = ((current_price - entry_price) / entry_price) * 100
+    else:
+        profit_percent = ((entry_price - current_price) / entry_price) * 100
+
+    # 检查是否触发止损
+    if is_long and current_price <= stop_loss_price:
+        return _ACTION_STOP_LOSS, profit_percent, stop_loss_price, stop_level, extreme_price, False
+    if not is_long and current_price >= stop_loss_price:
+        return _ACTION_STOP_LOSS, profit_percent, stop_loss_price, stop_level, extreme_price, False
+
+    action = _ACTION_NONE
+
+    # Level 1: 盈利≥1.8% → 止损移至成本+0.1%
+    if profit_percent >= 1.8 and stop_level < 1:
+        stop_loss_price = level_stops[0]
+        stop_level = 1
+        action = _ACTION_LEVEL_1
+
+    # Level 2: 盈利≥2.5% → 止损提至成本+1.9%
+    elif profit_percent >= 2.5 and stop_level < 2:
+        stop_loss_price = level_stops[1]
+        stop_level = 2
+        action = _ACTION_LEVEL_2
+
+    # Level 3: 盈利≥4.0% → 部分平仓50%，启用1.5%追踪止损
+    elif profit_percent >= 4.0 and stop_level < 3:
+        if not is_partial_closed:
+            stop_loss_price = level_stops[2]
+            stop_level = 3
+            trailing_percent = 1.5
+            extreme_price = current_price
+            has_trailing = True
+            action = _ACTION_LEVEL_3
+
+    # 追踪止损（Level 3之后）
+    trailing_moved = False
+    if stop_level >= 3 and has_trailing:
+        if is_long:
+            if current_price > extreme_price:
+                extreme_price = current_price
+                new_stop = current_price * (1 - trailing_percent / 100)
+                if new_stop > stop_loss_price:
+                    stop_loss_price = new_stop
+                    trailing_moved = True
+        else:  # SHORT
+            if current_price < extreme_price:
+                extreme_price = current_price
+                new_stop = current_price * (1 + trailing_percent / 100)
+                if new_stop < stop_loss_price:
+                    stop_loss_price = new_stop
+                    trailing_moved = True
+
+    return action, profit_percent, stop_loss_price, stop_level, extreme_price, trailing_moved
+
 
 class Backtest:
     """回测引擎"""
@@ -22,13 +125,15 @@ class Backtest:
                  initial_balance: float = 1000.0,
                  position_size_percent: float = 10.0,
                  leverage: int = 10,
-                 stop_loss_percent: float = 2.0):
+                 stop_loss_percent: float = 2.0,
+                 trades_csv: Optional[str] = None):
         """
         Args:
             initial_balance: 初始资金（USDT）
             position_size_percent: 单次开仓占总资金的百分比
             leverage: 杠杆倍数
             stop_loss_percent: 初始止损百分比
+            trades_csv: 交易明细CSV路径（可选），每笔平仓即时写入一行
         """
         self.initial_balance = initial_balance
         self.current_balance = initial_balance
@@ -37,14 +142,20 @@ class Backtest:
         self.stop_loss_percent = stop_loss_percent
 
         # 交易记录
-        self.trades: List[Dict] = []
+        self.trades: List[TradeRecord] = []
         self.positions: Dict[str, Dict] = {}  # 当前持仓
+        self.trades_csv = trades_csv
+        self._csv_file = None
+        self._csv_writer = None
 
         # 统计数据
         self.total_trades = 0
         self.winning_trades = 0
         self.losing_trades = 0
         self.total_profit = 0.0
+        self.total_win = 0.0  # 盈利交易的累计盈利
+        self.total_loss = 0.0  # 亏损交易的累计亏损（负数）
+        self.negative_trades = 0  # 盈亏<0的交易次数（不含盈亏为0的交易）
         self.max_drawdown = 0.0
         self.peak_balance = initial_balance
 
@@ -59,10 +170,13 @@ class Backtest:
         quantity = position_value / entry_price
 
         # 计算止损价
+        # 预先计算各级止损价（Level 1: 成本±0.1%，Level 2/3: 成本±1.9%），逐K线检查时无需重复计算
         if signal_type == SignalType.LONG:
             stop_loss_price = entry_price * (1 - self.stop_loss_percent / 100)
+            level_stops = (entry_price * 1.001, entry_price * 1.019, entry_price * 1.019)
         else:
             stop_loss_price = entry_price * (1 + self.stop_loss_percent / 100)
+            level_stops = (entry_price * 0.999, entry_price * 0.981, entry_price * 0.981)
 
         self.positions[symbol] = {
             "side": "LONG" if signal_type == SignalType.LONG else "SHORT",
@@ -71,6 +185,7 @@ class Backtest:
             "position_value": position_value,
             "stop_loss_price": stop_loss_price,
             "stop_level": 0,
+            "level_stops": level_stops,
             "is_partial_closed": False,
             "opened_at": timestamp,
             "reason": reason
@@ -80,101 +195,67 @@ class Backtest:
         return True
 
     def check_stop_loss(self, symbol: str, current_price: float, timestamp: datetime) -> bool:
-        """检查止损和移动止盈"""
+        """检查止损和移动止盈（数值计算在 _stop_loss_step 内核中完成）"""
         if symbol not in self.positions:
             return False
 
         position = self.positions[symbol]
         side = position["side"]
+        is_long = side == "LONG"
         entry_price = position["entry_price"]
-        stop_loss_price = position["stop_loss_price"]
-
-        # 计算当前盈亏百分比（基于价格，不含杠杆）
-        if side == "LONG":
-            profit_percent = ((current_price - entry_price) / entry_price) * 100
-        else:
-            profit_percent = ((entry_price - current_price) / entry_price) * 100
+        has_trailing = "trailing_stop_percent" in position
+        extreme_key = "highest_price" if is_long else "lowest_price"
+
+        action, profit_percent, new_stop, new_level, new_extreme, trailing_moved = _stop_loss_step(
+            is_long,
+            entry_price,
+            position["stop_loss_price"],
+            position["stop_level"],
+            position["is_partial_closed"],
+            position.get(extreme_key, entry_price),
+            position.get("trailing_stop_percent", 0.0),
+            has_trailing,
+            current_price,
+            position["level_stops"],
+        )
 
         # 检查是否触发止损
-        if side == "LONG" and current_price <= stop_loss_price:
-            self.close_position(symbol, current_price, timestamp, "STOP_LOSS")
-            return True
-        elif side == "SHORT" and current_price >= stop_loss_price:
+        if action == _ACTION_STOP_LOSS:
             self.close_position(symbol, current_price, timestamp, "STOP_LOSS")
             return True
 
-        # 4级止损逻辑
-        current_level = position["stop_level"]
+        position["stop_loss_price"] = new_stop
+        position["stop_level"] = new_level
 
-        # Level 1: 盈利≥1.8% → 止损移至成本+0.1%
-        if profit_percent >= 1.8 and current_level < 1:
-            if side == "LONG":
-                position["stop_loss_price"] = entry_price * 1.001
-            else:
-                position["stop_loss_price"] = entry_price * 0.999
-            position["stop_level"] = 1
+        if action == _ACTION_LEVEL_1:
             logger.info(f"[{timestamp}] {symbol} 触发Level 1: 盈利{profit_percent:.2f}%, 止损移至保本")
-
-        # Level 2: 盈利≥2.5% → 止损提至成本+1.9%
-        elif profit_percent >= 2.5 and current_level < 2:
-            if side == "LONG":
-                position["stop_loss_price"] = entry_price * 1.019
-            else:
-                position["stop_loss_price"] = entry_price * 0.981
-            position["stop_level"] = 2
+        elif action == _ACTION_LEVEL_2:
             logger.info(f"[{timestamp}] {symbol} 触发Level 2: 盈利{profit_percent:.2f}%, 锁定1.9%利润")
+        elif action == _ACTION_LEVEL_3:
+            # 部分平仓50%
+            close_quantity = position["quantity"] * 0.5
+            if is_long:
+                partial_pnl = (current_price - entry_price) * close_quantity
+            else:
+                partial_pnl = (entry_price - current_price) * close_quantity
+
+            # 计算杠杆盈亏
+            partial_pnl_with_leverage = partial_pnl * self.leverage
+            self.current_balance += partial_pnl_with_leverage
 
-        # Level 3: 盈利≥4.0% → 部分平仓50%
-        elif profit_percent >= 4.0 and current_level < 3:
-            if not position["is_partial_closed"]:
-                # 部分平仓50%
-                close_quantity = position["quantity"] * 0.5
-                if side == "LONG":
-                    partial_pnl = (current_price - entry_price) * close_quantity
-                else:
-                    partial_pnl = (entry_price - current_price) * close_quantity
-
-                # 计算杠杆盈亏
-                partial_pnl_with_leverage = partial_pnl * self.leverage
-                self.current_balance += partial_pnl_with_leverage
-
-                # 更新仓位
-                position["quantity"] *= 0.5
-                position["is_partial_closed"] = True
-                position["stop_level"] = 3
-
-                # 设置追踪止损（1.5%）
-                if side == "LONG":
-                    position["stop_loss_price"] = entry_price * 1.019
-                    position["trailing_stop_percent"] = 1.5
-                    position["highest_price"] = current_price
-                else:
-                    position["stop_loss_price"] = entry_price * 0.981
-                    position["trailing_stop_percent"] = 1.5
-                    position["lowest_price"] = current_price
-
-                logger.info(f"[{timestamp}] {symbol} 触发Level 3: 盈利{profit_percent:.2f}%, 部分平仓50%, 盈利{partial_pnl_with_leverage:.2f} USDT")
+            # 更新仓位，设置追踪止损（1.5%）
+            position["quantity"] *= 0.5
+            position["is_partial_closed"] = True
+            position["trailing_stop_percent"] = 1.5
+            position[extreme_key] = new_extreme
+
+            logger.info(f"[{timestamp}] {symbol} 触发Level 3: 盈利{profit_percent:.2f}%, 部分平仓50%, 盈利{partial_pnl_with_leverage:.2f} USDT")
 
         # 追踪止损（Level 3之后）
-        if position["stop_level"] >= 3 and "trailing_stop_percent" in position:
-            trailing_percent = position["trailing_stop_percent"]
-
-            if side == "LONG":
-                if current_price > position.get("highest_price", entry_price):
-                    position["highest_price"] = current_price
-                    # 更新追踪止损
-                    new_stop = current_price * (1 - trailing_percent / 100)
-                    if new_stop > position["stop_loss_price"]:
-                        position["stop_loss_price"] = new_stop
-                        logger.debug(f"[{timestamp}] {symbol} 追踪止损上移至 {new_stop:.6f}")
-            else:  # SHORT
-                if current_price < position.get("lowest_price", entry_price):
-                    position["lowest_price"] = current_price
-                    # 更新追踪止损
-                    new_stop = current_price * (1 + trailing_percent / 100)
-                    if new_stop < position["stop_loss_price"]:
-                        position["stop_loss_price"] = new_stop
-                        logger.debug(f"[{timestamp}] {symbol} 追踪止损下移至 {new_stop:.6f}")
+        if has_trailing:
+            position[extreme_key] = new_extreme
+            if trailing_moved:
+                logger.debug(f"[{timestamp}] {symbol} 追踪止损{'上移' if is_long else '下移'}至 {new_stop:.6f}")
 
         return False
 
@@ -203,28 +284,33 @@ class Backtest:
         self.current_balance += pnl_with_leverage
 
         # 记录交易
-        trade_record = {
-            "symbol": symbol,
-            "side": side,
-            "entry_price": entry_price,
-            "exit_price": exit_price,
-            "quantity": quantity,
-            "pnl": pnl_with_leverage,
-            "pnl_percent": pnl_percent,
-            "opened_at": position["opened_at"],
-            "closed_at": timestamp,
-            "reason": reason,
-            "stop_level": position["stop_level"],
-            "is_partial_closed": position["is_partial_closed"]
-        }
+        trade_record = TradeRecord(
+            symbol=symbol,
+            side=side,
+            entry_price=entry_price,
+            exit_price=exit_price,
+            quantity=quantity,
+            pnl=pnl_with_leverage,
+            pnl_percent=pnl_percent,
+            opened_at=position["opened_at"],
+            closed_at=timestamp,
+            reason=reason,
+            stop_level=position["stop_level"],
+            is_partial_closed=position["is_partial_closed"]
+        )
         self.trades.append(trade_record)
+        self._write_trade(trade_record)
 
         # 更新统计
         self.total_trades += 1
         if pnl_with_leverage > 0:
             self.winning_trades += 1
+            self.total_win += pnl_with_leverage
         else:
             self.losing_trades += 1
+            if pnl_with_leverage < 0:
+                self.negative_trades += 1
+                self.total_loss += pnl_with_leverage
         self.total_profit += pnl_with_leverage
 
         # 更新最大回撤
@@ -241,18 +327,32 @@ class Backtest:
         # 删除仓位
         del self.positions[symbol]
 
+    def _write_trade(self, trade_record: TradeRecord):
+        """将一笔交易追加到CSV（首笔交易时才创建文件）"""
+        if not self.trades_csv:
+            return
+        if self._csv_writer is None:
+            self._csv_file = open(self.trades_csv, "w", newline="", encoding="utf-8")
+            self._csv_writer = csv.writer(self._csv_file, lineterminator="\n")
+            self._csv_writer.writerow(TRADE_FIELDS)
+        self._csv_writer.writerow(trade_record)
+
+    def close(self):
+        """关闭交易明细CSV文件"""
+        if self._csv_file:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv_writer = None
+
     def get_statistics(self) -> Dict:
         """获取回测统计"""
         win_rate = (self.winning_trades / self.total_trades * 100) if self.total_trades > 0 else 0
 
-        # 计算平均盈利和亏损
-        winning_pnls = [t["pnl"] for t in self.trades if t["pnl"] > 0]
-        losing_pnls = [t["pnl"] for t in self.trades if t["pnl"] < 0]
-
-        avg_win = sum(winning_pnls) / len(winning_pnls) if winning_pnls else 0
-        avg_loss = sum(losing_pnls) / len(losing_pnls) if losing_pnls else 0
+        # 平均盈利和亏损（使用平仓时累计的汇总值，无需遍历交易记录）
+        avg_win = self.total_win / self.winning_trades if self.winning_trades else 0
+        avg_loss = self.total_loss / self.negative_trades if self.negative_trades else 0
 
-        profit_factor = abs(sum(winning_pnls) / sum(losing_pnls)) if losing_pnls else float('inf')
+        profit_factor = abs(self.total_win / self.total_loss) if self.negative_trades else float('inf')
 
         return {
             "initial_balance": self.initial_balance,
@@ -289,123 +389,154 @@ async def run_backtest(symbol: str,
     logger.info(f"杠杆: {leverage}x")
     logger.info(f"=" * 60)
 
-    # 创建回测引擎
+    # 创建回测引擎（交易明细边回测边写入CSV）
+    filename = f"backtest_{symbol}_{days}days_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     backtest = Backtest(
         initial_balance=initial_balance,
         position_size_percent=10.0,
         leverage=leverage,
-        stop_loss_percent=2.0
+        stop_loss_percent=2.0,
+        trades_csv=filename
     )
 
-    # 获取历史K线数据
-    logger.info(f"正在获取历史数据...")
-    end_time = datetime.now()
-    start_time = end_time - timedelta(days=days)
-
-    # 每次获取最多1000根K线
-    all_klines = []
-    current_time = start_time
-
-    while current_time < end_time:
-        try:
-            klines = await binance_api.get_klines(
-                symbol=symbol,
-                interval="1m",
-                limit=1000,
-                start_time=int(current_time.timestamp() * 1000)
-            )
-
-            if not klines:
+    try:
+        # 获取历史K线数据
+        logger.info(f"正在获取历史数据...")
+        end_time = datetime.now()
+        start_time = end_time - timedelta(days=days)
+
+        # 每次获取最多1000根K线：预先按时间切分所有分页，并发请求（信号量限制并发数，避免触发权重限制）
+        start_ms = int(start_time.timestamp() * 1000)
+        end_ms = int(end_time.timestamp() * 1000)
+        page_span_ms = KLINE_PAGE_LIMIT * 60_000
+        page_starts = range(start_ms, end_ms, page_span_ms)
+        semaphore = asyncio.Semaphore(KLINE_FETCH_CONCURRENCY)
+
+        async def fetch_page(page_start: int) -> List[list]:
+            async with semaphore:
+                for attempt in range(1, KLINE_FETCH_RETRIES + 1):
+                    try:
+                        return await binance_api.get_klines(
+                            symbol=symbol,
+                            interval="1m",
+                            limit=KLINE_PAGE_LIMIT,
+                            start_time=page_start,
+                            end_time=min(page_start + page_span_ms - 1, end_ms)
+                        )
+                    except Exception as e:
+                        if attempt == KLINE_FETCH_RETRIES:
+                            raise
+                        logger.warning(f"获取K线分页失败（第{attempt}次），稍后重试: {e}")
+                        await asyncio.sleep(2 ** attempt)
+
+        results = await asyncio.gather(*(fetch_page(ts) for ts in page_starts), return_exceptions=True)
+
+        # 按时间顺序合并分页，按开盘时间去重并排序
+        # 某一页重试后仍失败时在此截断，避免K线序列中出现时间缺口
+        klines_by_time = {}
+        for page_start, page in zip(page_starts, results):
+            if isinstance(page, Exception):
+                failed_at = datetime.fromtimestamp(page_start / 1000)
+                logger.error(f"获取K线数据失败（{failed_at} 起的分页），回测数据截断至此: {page}")
                 break
+            for kline in page:
+                klines_by_time[int(kline[0])] = kline
+        all_klines = [klines_by_time[t] for t in sorted(klines_by_time)]
 
-            all_klines.extend(klines)
-
-            # 更新时间
-            last_kline_time = int(klines[-1][0])
-            current_time = datetime.fromtimestamp(last_kline_time / 1000) + timedelta(minutes=1)
-
-            logger.info(f"已获取 {len(all_klines)} 根K线...")
-
-        except Exception as e:
-            logger.error(f"获取K线数据失败: {e}")
-            break
-
-    logger.info(f"共获取 {len(all_klines)} 根K线数据")
+        logger.info(f"共获取 {len(all_klines)} 根K线数据")
 
-    if len(all_klines) < 300:
-        logger.error("K线数据不足，无法进行回测")
-        return
-
-    # 开始回测
-    logger.info(f"\n开始回测交易...")
-
-    for i in range(250, len(all_klines)):
-        # 获取最近250根K线用于策略分析
-        recent_klines = all_klines[max(0, i-250):i+1]
-        current_kline = all_klines[i]
-
-        current_price = float(current_kline[4])  # 收盘价
-        timestamp = datetime.fromtimestamp(int(current_kline[0]) / 1000)
+        if len(all_klines) < 300:
+            logger.error("K线数据不足，无法进行回测")
+            return
 
-        # 检查现有持仓的止损
+        # 开始回测
+        logger.info(f"\n开始回测交易...")
+
+        # 全部K线只转换一次，之后每根K线的分析窗口都是该数组的视图
+        bars = Klines.from_raw(all_klines)
+
+        # 预先对整段序列计算成交量突破掩码（只依赖最近volume_period根K线，与窗口起点无关）
+        # 成交量不满足时 analyze 必然返回NONE，可直接跳过
+        volume_period = ema_advanced_strategy.volume_period
+        volume_ma = np.full(len(bars), np.inf)
+        volume_ma[volume_period - 1:] = technical_indicators.calculate_volume_average(bars, volume_period)
+        volume_surge = bars.volume >= volume_ma * ema_advanced_strategy.volume_multiplier
+
+        for i in range(250, len(bars)):
+            current_price = float(bars.close[i])  # 收盘价
+            timestamp = datetime.fromtimestamp(int(bars.open_time[i]) / 1000)
+
+            # 检查现有持仓的止损
+            for sym in list(backtest.positions.keys()):
+                backtest.check_stop_loss(sym, current_price, timestamp)
+
+            # 如果没有持仓，检查是否有开仓信号（使用最近250根K线的视图）
+            if symbol not in backtest.positions and volume_surge[i]:
+                signal = ema_advanced_strategy.analyze(symbol, bars[max(0, i-250):i+1])
+
+                if signal.signal_type != SignalType.NONE:
+                    backtest.open_position(
+                        symbol=symbol,
+                        signal_type=signal.signal_type,
+                        entry_price=current_price,
+                        timestamp=timestamp,
+                        reason=signal.message
+                    )
+
+        # 平掉所有剩余仓位
         for sym in list(backtest.positions.keys()):
-            backtest.check_stop_loss(sym, current_price, timestamp)
-
-        # 如果没有持仓，检查是否有开仓信号
-        if symbol not in backtest.positions:
-            signal = ema_advanced_strategy.analyze(symbol, recent_klines)
-
-            if signal.signal_type != SignalType.NONE:
-                backtest.open_position(
-                    symbol=symbol,
-                    signal_type=signal.signal_type,
-                    entry_price=current_price,
-                    timestamp=timestamp,
-                    reason=signal.message
-                )
-
-    # 平掉所有剩余仓位
-    for sym in list(backtest.positions.keys()):
-        last_price = float(all_klines[-1][4])
-        last_time = datetime.fromtimestamp(int(all_klines[-1][0]) / 1000)
-        backtest.close_position(sym, last_price, last_time, "BACKTEST_END")
-
-    # 生成报告
-    stats = backtest.get_statistics()
-
-    logger.info(f"\n" + "=" * 60)
-    logger.info(f"回测结果")
-    logger.info(f"=" * 60)
-    logger.info(f"初始资金: {stats['initial_balance']:.2f} USDT")
-    logger.info(f"最终资金: {stats['final_balance']:.2f} USDT")
-    logger.info(f"总盈亏: {stats['total_profit']:.2f} USDT ({stats['return_percent']:.2f}%)")
-    logger.info(f"-" * 60)
-    logger.info(f"总交易次数: {stats['total_trades']}")
-    logger.info(f"盈利次数: {stats['winning_trades']}")
-    logger.info(f"亏损次数: {stats['losing_trades']}")
-    logger.info(f"胜率: {stats['win_rate']:.2f}%")
-    logger.info(f"-" * 60)
-    logger.info(f"平均盈利: {stats['avg_win']:.2f} USDT")
-    logger.info(f"平均亏损: {stats['avg_loss']:.2f} USDT")
-    logger.info(f"盈亏比: {stats['profit_factor']:.2f}")
-    logger.info(f"最大回撤: {stats['max_drawdown']:.2f}%")
-    logger.info(f"=" * 60)
+            last_price = float(bars.close[-1])
+            last_time = datetime.fromtimestamp(int(bars.open_time[-1]) / 1000)
+            backtest.close_position(sym, last_price, last_time, "BACKTEST_END")
+
+        # 生成报告
+        stats = backtest.get_statistics()
+
+        # 汇总报告拼接后一次性输出，避免逐行写日志
+        report = [
+            "",
+            "=" * 60,
+            "回测结果",
+            "=" * 60,
+            f"初始资金: {stats['initial_balance']:.2f} USDT",
+            f"最终资金: {stats['final_balance']:.2f} USDT",
+            f"总盈亏: {stats['total_profit']:.2f} USDT ({stats['return_percent']:.2f}%)",
+            "-" * 60,
+            f"总交易次数: {stats['total_trades']}",
+            f"盈利次数: {stats['winning_trades']}",
+            f"亏损次数: {stats['losing_trades']}",
+            f"胜率: {stats['win_rate']:.2f}%",
+            "-" * 60,
+            f"平均盈利: {stats['avg_win']:.2f} USDT",
+            f"平均亏损: {stats['avg_loss']:.2f} USDT",
+            f"盈亏比: {stats['profit_factor']:.2f}",
+            f"最大回撤: {stats['max_drawdown']:.2f}%",
+            "=" * 60,
+        ]
+        logger.info("\n".join(report))
+    finally:
+        # 异常退出时也要关闭逐笔写入的交易明细CSV
+        backtest.close()
 
-    # 导出交易明细
     if backtest.trades:
-        df = pd.DataFrame(backtest.trades)
-        filename = f"backtest_{symbol}_{days}days_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        df.to_csv(filename, index=False)
         logger.info(f"\n交易明细已导出到: {filename}")
 
     return stats
 
 
 if __name__ == "__main__":
+    # uvloop 随 uvicorn[standard] 安装，可用时替换默认事件循环
+    try:
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+    except ImportError:
+        loop_factory = None
+
     # 示例：回测BTCUSDT最近7天的数据
-    asyncio.run(run_backtest(
-        symbol="BTCUSDT",
-        days=7,
-        initial_balance=1000.0,
-        leverage=10
-    ))
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(run_backtest(
+            symbol="BTCUSDT",
+            days=7,
+            initial_balance=1000.0,
+            leverage=10
+        ))
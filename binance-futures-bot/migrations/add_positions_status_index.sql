@@ -0,0 +1,6 @@
+-- 数据库迁移脚本：为持仓状态添加索引
+-- 创建时间：2026-10-15
+-- 描述：启动加载持仓和持仓列表接口按 status 过滤，新建库由 create_all 自动创建该索引，
+--       已有数据库需手动执行本脚本
+
+CREATE INDEX IF NOT EXISTS ix_positions_status ON positions (status);
@@ -0,0 +1,36 @@
+"""
+测试公共夹具
+
+app.database / app.utils.encryption 导入时会在当前目录下创建 data/（数据库、加密密钥），
+因此每个测试都在独立的临时目录中运行，这些模块只在测试或夹具内部导入。
+"""
+import asyncio
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _tmp_cwd(tmp_path, monkeypatch):
+    """每个测试切换到独立的临时目录，避免写入仓库下的 data/ 和回测CSV"""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """把 app.database 的引擎和会话工厂换成临时SQLite文件并建表，返回用于执行协程的函数"""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app import database
+    import app.models  # noqa: F401  注册表结构
+
+    # 每次 asyncio.run 都是新的事件循环，不复用连接
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(
+        database, "async_session", async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    )
+
+    asyncio.run(database.init_db())
+    yield asyncio.run
+    asyncio.run(engine.dispose())
@@ -0,0 +1,151 @@
+"""
+回测引擎测试：止损/4级止盈状态转移与交易明细导出
+"""
+import asyncio
+import csv
+import types
+from datetime import datetime
+
+import pytest
+
+import backtest
+from app.services.strategy import SignalType
+from backtest import (
+    Backtest, TRADE_FIELDS, _stop_loss_step,
+    _ACTION_NONE, _ACTION_STOP_LOSS, _ACTION_LEVEL_1, _ACTION_LEVEL_2, _ACTION_LEVEL_3,
+)
+
+T0 = datetime(2024, 1, 1)
+LEVEL_STOPS_LONG = (100 * 1.001, 100 * 1.019, 100 * 1.019)
+
+
+def _step(current_price, stop_loss_price=98.0, stop_level=0, is_partial_closed=False,
+          extreme_price=100.0, trailing_percent=0.0, has_trailing=False, is_long=True):
+    return _stop_loss_step(is_long, 100.0, stop_loss_price, stop_level, is_partial_closed,
+                           extreme_price, trailing_percent, has_trailing, current_price,
+                           LEVEL_STOPS_LONG)
+
+
+def test_kernel_stop_loss_hit():
+    action, profit, stop, level, _, _ = _step(97.9)
+    assert action == _ACTION_STOP_LOSS
+    assert profit == pytest.approx(-2.1)
+    assert (stop, level) == (98.0, 0)
+
+
+def test_kernel_level_transitions():
+    assert _step(101.0)[0] == _ACTION_NONE
+
+    action, _, stop, level, _, _ = _step(101.9)
+    assert (action, stop, level) == (_ACTION_LEVEL_1, LEVEL_STOPS_LONG[0], 1)
+
+    action, _, stop, level, _, _ = _step(102.6, stop_loss_price=LEVEL_STOPS_LONG[0], stop_level=1)
+    assert (action, stop, level) == (_ACTION_LEVEL_2, LEVEL_STOPS_LONG[1], 2)
+
+    action, _, stop, level, extreme, moved = _step(104.1, stop_loss_price=LEVEL_STOPS_LONG[1], stop_level=2)
+    assert (action, stop, level, extreme, moved) == (_ACTION_LEVEL_3, LEVEL_STOPS_LONG[2], 3, 104.1, False)
+
+
+def test_kernel_trailing_stop_only_moves_forward():
+    state = dict(stop_loss_price=LEVEL_STOPS_LONG[2], stop_level=3, is_partial_closed=True,
+                 extreme_price=104.0, trailing_percent=1.5, has_trailing=True)
+
+    _, _, stop, _, extreme, moved = _step(106.0, **state)
+    assert moved and extreme == 106.0
+    assert stop == pytest.approx(106.0 * 0.985)
+
+    # 回落但未触发止损：极值与止损价均不变
+    state.update(stop_loss_price=stop, extreme_price=extreme)
+    _, _, stop_after, _, extreme_after, moved = _step(105.0, **state)
+    assert not moved and extreme_after == 106.0 and stop_after == stop
+
+
+def test_backtest_long_lifecycle():
+    bt = Backtest(initial_balance=1000.0, position_size_percent=10.0, leverage=10)
+    assert bt.open_position("X", SignalType.LONG, 100.0, T0)
+    assert not bt.open_position("X", SignalType.LONG, 100.0, T0)
+
+    for price in (101.9, 102.6, 104.1):
+        assert bt.check_stop_loss("X", price, T0) is False
+    position = bt.positions["X"]
+    assert position["stop_level"] == 3
+    assert position["is_partial_closed"]
+    assert position["quantity"] == pytest.approx(0.5)
+    # 部分平仓: 0.5 * 4.1 * 10倍杠杆
+    assert bt.current_balance == pytest.approx(1020.5)
+
+    bt.check_stop_loss("X", 110.0, T0)
+    assert position["stop_loss_price"] == pytest.approx(110.0 * 0.985)
+
+    assert bt.check_stop_loss("X", 108.0, T0) is True
+    assert "X" not in bt.positions
+    trade = bt.trades[-1]
+    assert trade.reason == "STOP_LOSS"
+    assert trade.pnl == pytest.approx((108.0 - 100.0) * 0.5 * 10)
+
+    stats = bt.get_statistics()
+    assert stats["total_trades"] == 1
+    assert stats["winning_trades"] == 1
+
+
+def test_backtest_short_stop_loss_and_statistics():
+    bt = Backtest(initial_balance=1000.0, leverage=10, stop_loss_percent=2.0)
+    bt.open_position("X", SignalType.SHORT, 100.0, T0)
+    assert bt.check_stop_loss("X", 101.0, T0) is False
+    assert bt.check_stop_loss("X", 102.0, T0) is True
+
+    stats = bt.get_statistics()
+    assert stats["losing_trades"] == 1
+    assert stats["avg_loss"] == pytest.approx(-20.0)
+    assert bt.current_balance == pytest.approx(980.0)
+
+
+def test_trades_csv_streamed_with_unix_newlines(tmp_path):
+    path = tmp_path / "trades.csv"
+    bt = Backtest(trades_csv=str(path))
+    for i in range(3):
+        bt.open_position("X", SignalType.LONG, 100.0 + i, T0)
+        bt.close_position("X", 101.0 + i, T0)
+    bt.close()
+
+    content = path.read_bytes()
+    assert b"\r\n" not in content
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == TRADE_FIELDS
+    assert len(rows) == 4
+    assert rows[1][TRADE_FIELDS.index("reason")] == "SIGNAL"
+
+
+def test_no_csv_created_without_trades(tmp_path):
+    path = tmp_path / "trades.csv"
+    bt = Backtest(trades_csv=str(path))
+    bt.close()
+    assert not path.exists()
+
+
+def test_run_backtest_closes_csv_when_interrupted(monkeypatch):
+    klines = [[60_000 * i, "100", "100", "100", "100", "0", 60_000 * i + 59_999] for i in range(300)]
+    opened = []
+
+    async def get_klines(**kwargs):
+        return klines
+
+    def analyze(symbol, bars):
+        return types.SimpleNamespace(signal_type=SignalType.LONG, message="test")
+
+    def get_statistics(self):
+        opened.append(self)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(backtest.binance_api, "get_klines", get_klines)
+    monkeypatch.setattr(backtest.ema_advanced_strategy, "analyze", analyze)
+    monkeypatch.setattr(Backtest, "get_statistics", get_statistics)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(backtest.run_backtest("XUSDT", days=1))
+
+    # 回测结束时的平仓已写入CSV，异常退出后文件仍被关闭
+    [bt] = opened
+    assert bt.trades and bt.trades[-1].reason == "BACKTEST_END"
+    assert bt._csv_file is None
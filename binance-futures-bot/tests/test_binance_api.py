@@ -0,0 +1,66 @@
+"""
+24hr涨跌幅筛选测试：NumPy向量化路径与逐条回退路径结果一致
+"""
+import asyncio
+import random
+
+import pytest
+
+from app.services.binance_api import BinanceAPI
+
+
+def _ticker(symbol, change, **fields):
+    ticker = {"symbol": symbol, "priceChangePercent": change, "lastPrice": "1.5", "highPrice": "2",
+              "lowPrice": "1", "volume": "10", "quoteVolume": "20"}
+    ticker.update(fields)
+    return ticker
+
+
+def _high_change(tickers, min_change_percent=30.0):
+    api = BinanceAPI()
+
+    async def fake_ticker(symbol=None):
+        return tickers
+
+    api.get_24hr_ticker = fake_ticker
+    return asyncio.run(api.get_high_change_symbols(min_change_percent))
+
+
+def test_filters_usdt_and_sorts_by_abs_change():
+    tickers = [
+        _ticker("AUSDT", "31.0"),
+        _ticker("BUSDT", "-45.5"),
+        _ticker("CBTC", "90.0"),
+        _ticker("DUSDT", "29.9"),
+        _ticker("EUSDT", "-30.0"),
+        _ticker("FUSDT", "45.5"),
+    ]
+    result = _high_change(tickers)
+
+    # 绝对值相同时保持原顺序
+    assert [r["symbol"] for r in result] == ["BUSDT", "FUSDT", "AUSDT", "EUSDT"]
+    assert result[0] == {"symbol": "BUSDT", "priceChangePercent": -45.5, "lastPrice": 1.5, "highPrice": 2.0,
+                         "lowPrice": 1.0, "volume": 10.0, "quoteVolume": 20.0}
+
+
+def test_rows_with_bad_fields_are_skipped():
+    tickers = [_ticker("AUSDT", "50"), _ticker("BUSDT", "60", lastPrice="bad"), _ticker("CUSDT", None)]
+    assert [r["symbol"] for r in _high_change(tickers)] == ["AUSDT"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_path_matches_scalar_fallback(seed):
+    rng = random.Random(seed)
+    tickers = [
+        _ticker(f"S{i}" + rng.choice(["USDT", "USDC", "BTC"]), str(round(rng.uniform(-80, 80), 1)))
+        for i in range(300)
+    ]
+    api = BinanceAPI()
+    usdt = [t for t in tickers if t["symbol"].endswith("USDT")]
+
+    vectorized = _high_change(tickers)
+    assert vectorized == api._filter_high_change_scalar(usdt, 30.0)
+
+    # 无法解析的涨跌幅触发回退路径，其余结果不变
+    broken = tickers + [_ticker("XUSDT", "n/a")]
+    assert _high_change(broken) == vectorized
@@ -0,0 +1,131 @@
+"""
+技术指标内核测试：与逐行计算的参考实现对比
+"""
+import numpy as np
+import pytest
+
+from app.utils.indicators import Klines, TechnicalIndicators, _adx_core, _ema_smooth
+
+
+def _random_klines(n: int, seed: int = 0) -> list:
+    """生成随机K线（币安原始格式，数值为字符串）"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, n))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    volume = rng.uniform(10, 1000, n)
+    return [
+        [60_000 * i, str(open_[i]), str(high[i]), str(low[i]), str(close[i]), str(volume[i]),
+         60_000 * i + 59_999, "0", 0, "0", "0", "0"]
+        for i in range(n)
+    ]
+
+
+def _reference_wilder(values, period):
+    out = [0.0] * len(values)
+    out[period - 1] = sum(values[:period]) / period
+    for i in range(period, len(values)):
+        out[i] = out[i - 1] + (values[i] - out[i - 1]) / period
+    return out
+
+
+def _reference_adx(high, low, close, period):
+    """逐行实现的ADX（与向量化前的算法一致）"""
+    n = len(high) - 1
+    plus_dm, minus_dm, tr = [], [], []
+    for i in range(1, len(high)):
+        high_diff = high[i] - high[i - 1]
+        low_diff = low[i - 1] - low[i]
+        plus_dm.append(high_diff if high_diff > low_diff and high_diff > 0 else 0.0)
+        minus_dm.append(low_diff if low_diff > high_diff and low_diff > 0 else 0.0)
+        tr.append(max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1])))
+
+    atr = _reference_wilder(tr, period)
+    spdm = [0.0] * n
+    sndm = [0.0] * n
+    spdm[period - 1] = sum(plus_dm[:period])
+    sndm[period - 1] = sum(minus_dm[:period])
+    for i in range(period, n):
+        spdm[i] = spdm[i - 1] - spdm[i - 1] / period + plus_dm[i]
+        sndm[i] = sndm[i - 1] - sndm[i - 1] / period + minus_dm[i]
+
+    plus_di = [0.0] * n
+    minus_di = [0.0] * n
+    dx = [0.0] * n
+    for i in range(period - 1, n):
+        if atr[i] != 0:
+            plus_di[i] = spdm[i] / atr[i] * 100
+            minus_di[i] = sndm[i] / atr[i] * 100
+        di_sum = plus_di[i] + minus_di[i]
+        if di_sum != 0:
+            dx[i] = abs(plus_di[i] - minus_di[i]) / di_sum * 100
+
+    adx = [0.0] * n
+    adx[2 * period - 2] = sum(dx[period - 1:2 * period - 1]) / period
+    for i in range(2 * period - 1, n):
+        adx[i] = (adx[i - 1] * (period - 1) + dx[i]) / period
+    return adx, plus_di, minus_di
+
+
+def test_ema_smooth_matches_reference():
+    values = np.random.default_rng(1).uniform(0, 5, 200)
+    np.testing.assert_allclose(_ema_smooth(values, 14), _reference_wilder(list(values), 14), rtol=1e-9)
+
+
+@pytest.mark.parametrize("period", [5, 14])
+def test_adx_core_matches_reference(period):
+    bars = Klines.from_raw(_random_klines(300, seed=period))
+    expected = _reference_adx(list(bars.high), list(bars.low), list(bars.close), period)
+    actual = _adx_core(bars.high, bars.low, bars.close, period)
+    for got, want in zip(actual, expected):
+        np.testing.assert_allclose(got, want, rtol=1e-7, atol=1e-9)
+
+
+def test_calculate_atr_matches_reference():
+    klines = _random_klines(100)
+    bars = Klines.from_raw(klines)
+    tr = [
+        max(bars.high[i] - bars.low[i], abs(bars.high[i] - bars.close[i - 1]), abs(bars.low[i] - bars.close[i - 1]))
+        for i in range(1, len(bars))
+    ]
+    np.testing.assert_allclose(TechnicalIndicators.calculate_atr(klines, 14), _reference_wilder(tr, 14), rtol=1e-9)
+
+
+def test_klines_from_raw_mixed_row_lengths():
+    # REST K线为12列，缓存中的K线为7列，混合时只取前6列
+    rest = _random_klines(3)
+    cached = [k[:7] for k in _random_klines(2, seed=5)]
+    bars = Klines.from_raw(rest + cached)
+
+    assert len(bars) == 5
+    assert bars.open_time.dtype == np.int64
+    np.testing.assert_array_equal(bars.close, [float(k[4]) for k in rest + cached])
+    np.testing.assert_array_equal(bars.volume, [float(k[5]) for k in rest + cached])
+    assert bars.close.flags["C_CONTIGUOUS"]
+
+
+def test_klines_from_raw_passthrough_and_slice_views():
+    bars = Klines.from_raw(_random_klines(10))
+    assert Klines.from_raw(bars) is bars
+
+    window = bars[2:5]
+    assert len(window) == 3
+    assert np.shares_memory(window.close, bars.close)
+
+
+def test_volume_average_matches_rolling_mean():
+    klines = _random_klines(60)
+    volumes = [float(k[5]) for k in klines]
+    expected = [sum(volumes[i:i + 30]) / 30 for i in range(len(volumes) - 29)]
+
+    np.testing.assert_allclose(TechnicalIndicators.calculate_volume_average(klines, 30), expected, rtol=1e-9)
+
+
+def test_last_volume_average_and_surge():
+    klines = _random_klines(60)
+    volumes = [float(k[5]) for k in klines]
+    last_average = sum(volumes[-30:]) / 30
+
+    assert TechnicalIndicators.calculate_last_volume_average(klines, 30) == pytest.approx(last_average)
+    assert TechnicalIndicators.check_volume_surge(klines, 30, 1.8) is (volumes[-1] >= last_average * 1.8)
@@ -0,0 +1,25 @@
+"""
+主页测试：不依赖工作目录读取页面，ETag命中返回304
+"""
+import asyncio
+
+import httpx
+
+
+def test_index_served_with_etag_and_304():
+    # 在临时目录中导入，页面路径不能依赖当前工作目录（见 conftest）
+    from app.main import INDEX_ETAG, INDEX_HTML, app
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/")
+            cached = await client.get("/", headers={"If-None-Match": INDEX_ETAG})
+            return first, cached
+
+    first, cached = asyncio.run(run())
+    assert first.status_code == 200
+    assert first.content == INDEX_HTML
+    assert first.headers["etag"] == INDEX_ETAG
+    assert cached.status_code == 304
+    assert cached.content == b""
@@ -0,0 +1,195 @@
+"""
+交易对/配置API测试：系统配置upsert、批量插入、更新通知与NDJSON流式分页
+
+app.api.routes 等模块导入时会创建 data/ 和加密密钥，统一在夹具/测试内部导入（见 conftest）
+"""
+import types
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.api.schemas import TradingPairCreate, TradingPairUpdate
+
+
+@pytest.fixture
+def routes(db):
+    from app.api import routes
+    return routes
+
+
+@pytest.fixture
+def events():
+    """收集配置变更通知"""
+    from app.config import config_manager
+
+    received = []
+
+    def observer(change_type, data):
+        received.append((change_type, data))
+
+    config_manager.add_observer(observer)
+    yield received
+    config_manager.remove_observer(observer)
+
+
+async def _symbols():
+    from sqlalchemy import select
+    from app.database import DatabaseManager
+    from app.models import TradingPair
+
+    session = await DatabaseManager.get_session()
+    try:
+        return sorted((await session.scalars(select(TradingPair.symbol))).all())
+    finally:
+        await session.close()
+
+
+async def _system_configs():
+    from sqlalchemy import select
+    from app.database import DatabaseManager
+    from app.models import SystemConfig
+
+    session = await DatabaseManager.get_session()
+    try:
+        rows = (await session.scalars(select(SystemConfig))).all()
+        return {row.key: (row.value, row.description) for row in rows}
+    finally:
+        await session.close()
+
+
+def test_upsert_system_configs_inserts_then_updates(db, routes):
+    from app.database import DatabaseManager
+
+    async def upsert(configs):
+        session = await DatabaseManager.get_session()
+        try:
+            await routes._upsert_system_configs(session, configs)
+            await session.commit()
+        finally:
+            await session.close()
+        return await _system_configs()
+
+    first = db(upsert([("a", "1", "A"), ("b", "2", "B")]))
+    second = db(upsert([("b", "3", "B2"), ("c", "4", "C")]))
+
+    assert first == {"a": ("1", "A"), "b": ("2", "B")}
+    assert second == {"a": ("1", "A"), "b": ("3", "B2"), "c": ("4", "C")}
+
+
+def test_upsert_insert_rejects_dialect_without_on_conflict(db, monkeypatch):
+    from app import database
+    from app.models import SystemConfig
+
+    monkeypatch.setattr(database, "engine", types.SimpleNamespace(dialect=types.SimpleNamespace(name="mysql")))
+    with pytest.raises(NotImplementedError):
+        database.upsert_insert(SystemConfig)
+
+
+def test_bulk_route_inserts_new_pairs_and_skips_existing(db, routes, events):
+    async def run():
+        await routes.create_trading_pair(TradingPairCreate(symbol="BTCUSDT"))
+        events.clear()
+        created = await routes.create_trading_pairs_bulk([
+            TradingPairCreate(symbol="btcusdt", leverage=3),
+            TradingPairCreate(symbol="ethusdt", leverage=5),
+            TradingPairCreate(symbol="SOLUSDT", is_active=False),
+            TradingPairCreate(symbol="ETHUSDT", leverage=7),
+        ])
+        return created, await _symbols()
+
+    created, symbols = db(run())
+    # 已存在的跳过；同一请求内重复的symbol以最后一个为准
+    by_symbol = {p.symbol: p for p in created}
+    assert set(by_symbol) == {"ETHUSDT", "SOLUSDT"}
+    assert by_symbol["ETHUSDT"].leverage == 7
+    assert symbols == ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+    # 只通知新建且启用的交易对
+    assert [data["symbol"] for _, data in events] == ["ETHUSDT"]
+
+
+def test_bulk_route_empty_payload(db, routes):
+    assert db(routes.create_trading_pairs_bulk([])) == []
+
+
+def test_add_trading_pairs_bulk_returns_only_inserted(db):
+    from app.services.telegram import add_trading_pairs_bulk, get_existing_symbols
+
+    async def run():
+        first = await add_trading_pairs_bulk([{"symbol": "AUSDT", "leverage": 5}, {"symbol": "BUSDT", "leverage": 5}])
+        second = await add_trading_pairs_bulk([{"symbol": "BUSDT", "leverage": 9}, {"symbol": "CUSDT", "leverage": 9}])
+        existing = await get_existing_symbols(["AUSDT", "CUSDT", "ZUSDT"])
+        return first, second, existing, await _symbols()
+
+    first, second, existing, symbols = db(run())
+    assert sorted(first) == ["AUSDT", "BUSDT"]
+    assert second == ["CUSDT"]
+    assert existing == {"AUSDT", "CUSDT"}
+    assert symbols == ["AUSDT", "BUSDT", "CUSDT"]
+    assert db(add_trading_pairs_bulk([])) == []
+
+
+def test_update_notifies_only_on_actual_change(db, routes, events):
+    async def run():
+        await routes.create_trading_pair(TradingPairCreate(symbol="BTCUSDT", is_active=True))
+        events.clear()
+        same = await routes.update_trading_pair("btcusdt", TradingPairUpdate(is_active=True, leverage=4))
+        after_same = len(events)
+        changed = await routes.update_trading_pair("BTCUSDT", TradingPairUpdate(strategy_interval="5m"))
+        return same, after_same, changed
+
+    same, after_same, changed = db(run())
+    assert same.leverage == 4
+    assert after_same == 0
+    assert changed.strategy_interval == "5m"
+    assert events == [("trading_pair_updated", {"symbol": "BTCUSDT", "interval": "5m", "is_active": True})]
+
+
+def test_update_and_delete_missing_pair_return_404(db, routes):
+    with pytest.raises(HTTPException) as exc:
+        db(routes.update_trading_pair("NOPE", TradingPairUpdate(leverage=2)))
+    assert exc.value.status_code == 404
+
+    with pytest.raises(HTTPException) as exc:
+        db(routes.delete_trading_pair("NOPE"))
+    assert exc.value.status_code == 404
+
+
+def test_positions_stream_paginates_by_cursor(db, routes):
+    from sqlalchemy import delete, select
+    from app.database import DatabaseManager
+    from app.models import Position
+
+    async def seed():
+        session = await DatabaseManager.get_session()
+        try:
+            await session.execute(delete(Position))
+            session.add_all([
+                Position(symbol=f"S{i}USDT", side="LONG", entry_price=1.0 + i, quantity=1.0, leverage=5,
+                         status="OPEN" if i % 2 else "CLOSED")
+                for i in range(5)
+            ])
+            await session.commit()
+            return sorted((await session.scalars(select(Position.id))).all())
+        finally:
+            await session.close()
+
+    async def read(**params):
+        response = await routes.stream_positions(**{"status": None, "cursor": None, "limit": 500, **params})
+        assert response.media_type == "application/x-ndjson"
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        return [orjson.loads(line) for line in body.splitlines()]
+
+    ids = db(seed())
+
+    rows = db(read())
+    assert [r["id"] for r in rows] == ids[::-1]
+    assert rows[0]["opened_at"] is not None
+
+    page1 = db(read(limit=2))
+    page2 = db(read(limit=2, cursor=page1[-1]["id"]))
+    assert [r["id"] for r in page1 + page2] == ids[::-1][:4]
+
+    open_rows = db(read(status="open"))
+    assert {r["status"] for r in open_rows} == {"OPEN"}
+    assert len(open_rows) == 2
@@ -0,0 +1,138 @@
+"""
+Telegram发送队列测试：后台worker、消息合并与合并失败时的逐条回退
+"""
+import asyncio
+
+
+class FakeBot:
+    """记录发送内容；带parse_mode且包含BAD的消息模拟Telegram解析失败"""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        await self.gate.wait()
+        if parse_mode and "BAD" in text:
+            raise RuntimeError("can't parse entities")
+        self.sent.append((text, parse_mode))
+
+
+def _service(bot: FakeBot = None, queue_maxsize: int = None):
+    # 应用模块在测试内部导入，收集阶段不产生副作用（见 conftest）
+    from app.services.telegram import TelegramService
+
+    service = TelegramService()
+    if queue_maxsize:
+        service.QUEUE_MAXSIZE = queue_maxsize
+    if bot:
+        service._bot = bot
+        service._initialized = True
+        service._start_worker()
+    return service
+
+
+def test_queued_send_returns_on_enqueue_and_worker_delivers():
+    async def run():
+        bot = FakeBot()
+        service = _service(bot)
+        assert await service.send_message("hello") is True
+        await service.stop()
+        return bot.sent
+
+    assert asyncio.run(run()) == [("hello", "Markdown")]
+
+
+def test_wait_returns_actual_result():
+    async def run():
+        bot = FakeBot()
+        service = _service(bot)
+        ok = await service.send_message("hi", wait=True)
+        # 带格式失败后退回纯文本仍算成功
+        fallback = await service.send_message("BAD *", wait=True)
+        await service.stop()
+        return ok, fallback, bot.sent
+
+    ok, fallback, sent = asyncio.run(run())
+    assert ok and fallback
+    assert sent == [("hi", "Markdown"), ("BAD *", None)]
+
+
+def test_queue_full_returns_false():
+    async def run():
+        bot = FakeBot()
+        bot.gate.clear()
+        service = _service(bot, queue_maxsize=2)
+        results = [await service.send_message(f"m{i}") for i in range(4)]
+        bot.gate.set()
+        await service.stop()
+        return results
+
+    # worker尚未取走消息，超出队列容量的消息被丢弃并返回False
+    assert asyncio.run(run()) == [True, True, False, False]
+
+
+def test_coalesce_groups_adjacent_same_mode_within_length_limit():
+    service = _service()
+    service.MAX_MESSAGE_LENGTH = 10
+    batch = [("aaa", "Markdown"), ("bbb", "Markdown"), ("ccc", "HTML"), ("dddd", "HTML"), ("eeeee", "HTML")]
+
+    assert service._coalesce(batch) == [
+        ("Markdown", ["aaa", "bbb"]),
+        ("HTML", ["ccc", "dddd"]),
+        ("HTML", ["eeeee"]),
+    ]
+
+
+def test_backlog_is_merged_into_one_request():
+    async def run():
+        bot = FakeBot()
+        bot.gate.clear()
+        service = _service(bot)
+        for i in range(1 + service.COALESCE_THRESHOLD + 1):
+            await service.send_message(f"m{i}")
+        bot.gate.set()
+        await service.stop()
+        return bot.sent
+
+    assert asyncio.run(run()) == [("\n\n".join(f"m{i}" for i in range(7)), "Markdown")]
+
+
+def test_small_backlog_is_sent_separately():
+    async def run():
+        bot = FakeBot()
+        bot.gate.clear()
+        service = _service(bot)
+        await service.send_message("a")
+        await service.send_message("b")
+        bot.gate.set()
+        await service.stop()
+        return bot.sent
+
+    assert asyncio.run(run()) == [("a", "Markdown"), ("b", "Markdown")]
+
+
+def test_failed_merged_send_falls_back_to_individual_messages():
+    async def run():
+        bot = FakeBot()
+        bot.gate.clear()
+        service = _service(bot)
+        messages = ["m0", "m1", "BAD *", "m3", "m4", "m5", "m6"]
+        for message in messages:
+            await service.send_message(message)
+        bot.gate.set()
+        await service.stop()
+        return bot.sent
+
+    sent = asyncio.run(run())
+    # 合并消息被拒后逐条发送：正常消息保留格式，只有出错的那条退回纯文本
+    assert sent == [
+        ("m0", "Markdown"),
+        ("m1", "Markdown"),
+        ("BAD *", None),
+        ("m3", "Markdown"),
+        ("m4", "Markdown"),
+        ("m5", "Markdown"),
+        ("m6", "Markdown"),
+    ]
@@ -0,0 +1,39 @@
+"""
+止损调整日志测试：暂存的日志批量写入时保留调整发生的时间
+"""
+import types
+
+
+def test_buffered_stop_loss_logs_keep_adjustment_time(db):
+    from sqlalchemy import select
+    from app.database import DatabaseManager
+    from app.models import StopLossLog
+    from app.services.trailing_stop import TrailingStopManager
+
+    manager = TrailingStopManager()
+    position = types.SimpleNamespace(symbol="BTCUSDT", side="LONG", entry_price=100.0)
+
+    async def log(new_stop_price):
+        await manager._log_stop_loss_adjustment(
+            position, old_stop_price=98.0, new_stop_price=new_stop_price, current_price=103.0,
+            profit_percent=3.0, locked_profit_percent=1.0, old_level=0, new_level=1,
+            is_trailing=False, adjust_reason="level_up", adjust_detail="test",
+        )
+
+    async def run():
+        await log(100.0)
+        await log(101.0)
+        buffered = [row["created_at"] for row in manager._pending_logs]
+        await manager._flush_stop_loss_logs()
+
+        session = await DatabaseManager.get_session()
+        try:
+            rows = (await session.scalars(select(StopLossLog).order_by(StopLossLog.id))).all()
+        finally:
+            await session.close()
+        return buffered, rows
+
+    buffered, rows = db(run())
+    assert manager._pending_logs == []
+    assert [row.new_stop_price for row in rows] == [100.0, 101.0]
+    assert [row.created_at for row in rows] == buffered